@@ -1,12 +1,27 @@
+import os
 from flask import Flask
 from flask_cors import CORS
-from .routes import main
 
-def create_app():
+# Load the index in the background as soon as the app is created; with 0 it
+# is loaded by the first request that needs it
+WARMUP = os.getenv("COURSE_INDEX_WARMUP", "1") != "0"
+
+def create_app(background=True):
     app = Flask(__name__)
     CORS(app)
 
-    # Register blueprint
+    # Register blueprint (imported here so build_index.py can use the package without an index)
+    from .routes import main, holder
+    from .admin import admin, start_compaction, start_watcher
     app.register_blueprint(main)
+    app.register_blueprint(admin)
+
+    # Periodic refit of catalog changes made through the admin API, and
+    # pick-up of versions built offline (serve.py starts these per worker)
+    if background:
+        if WARMUP:
+            holder.warmup()
+        start_compaction()
+        start_watcher()
 
     return app
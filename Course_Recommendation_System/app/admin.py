@@ -0,0 +1,299 @@
+import os
+import threading
+import time
+from functools import wraps
+import numpy as np
+import pandas as pd
+from flask import Blueprint, request, jsonify
+from .ann import IVFSearcher, build_ivf
+from .index import INDEX_DIR, latest_version, load_index, save_index
+from .routes import holder
+
+# Admin API for live catalog changes.
+#
+# Appends, updates and deletes are applied to a copy-on-write delta on top of
+# the memory-mapped index and published through the holder, so they go live
+# immediately without refitting. A background compaction periodically refits
+# TF-IDF and Word2Vec over the live catalog and writes a fresh index version.
+#
+# Versions built offline by build_index.py are picked up without a restart,
+# either through POST /admin/reload or by a watcher polling the LATEST
+# pointer. Requests already running finish on the index they started with.
+
+ADMIN_TOKEN = os.getenv("RECOMMEND_ADMIN_TOKEN", "")
+COMPACTION_INTERVAL = float(os.getenv("RECOMMEND_COMPACTION_INTERVAL", "3600"))
+# Seconds between checks of <root>/LATEST for a new build (0 disables the watcher)
+WATCH_INTERVAL = float(os.getenv("COURSE_INDEX_WATCH_INTERVAL", "0"))
+# Set by serve.py; changes held in one worker's memory would not reach the others
+WORKERS = int(os.getenv("RECOMMEND_WORKERS", "1"))
+
+admin = Blueprint('admin', __name__, url_prefix='/admin')
+
+# Serializes writers (changes and the final swap of compaction and reload);
+# readers never take it
+write_lock = threading.Lock()
+# Serializes changes of the base version (compaction and reload). Compaction
+# holds it while refitting, so it is always taken before write_lock
+version_lock = threading.Lock()
+_compactor = None
+_watcher = None
+
+
+def admin_required(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "Admin API is disabled; set RECOMMEND_ADMIN_TOKEN"}), 403
+        if request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+            return jsonify({"error": "Unauthorized"}), 401
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def single_process(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if WORKERS > 1:
+            return jsonify({"error": "Not available with multiple worker processes; "
+                                     "rebuild with build_index.py and the workers pick it up"}), 409
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def to_frame(index, courses):
+    """Course dicts as catalog rows, with the catalog's columns and numeric types."""
+    for course in courses:
+        if not all(str(course.get(field, "")).strip() for field in ("course_id", "course_title", "subject")):
+            raise ValueError("Each course needs course_id, course_title and subject")
+    columns = [column for column in index.catalog.columns if column != "popularity_rating"]
+    frame = pd.DataFrame(courses).reindex(columns=columns)
+    for column in columns:
+        if column == "course_id":
+            continue
+        if pd.api.types.is_numeric_dtype(index.catalog[column]):
+            frame[column] = pd.to_numeric(frame[column], errors="coerce").fillna(0).astype(index.catalog[column].dtype)
+        else:
+            frame[column] = frame[column].fillna("")
+    return frame
+
+
+def apply_changes(upserts=None, deletes=()):
+    with write_lock:
+        index = holder.get().with_changes(upserts, deletes)
+        holder.swap(index)
+        return index
+
+
+def compact():
+    """Refit the models over the live catalog and serve the result as a new index version.
+
+    The refit works on a snapshot without holding write_lock, so admin changes
+    keep going live meanwhile; those made after the snapshot are replayed onto
+    the new version when it is swapped in.
+    """
+    with version_lock:
+        index = holder.get()
+        if not index.changes:
+            return index
+
+        # Imported here: gensim is only needed when refitting
+        from .preprocess import CSV_DTYPES, prepare, build_features
+        catalog = index.live_catalog().drop(columns=["popularity_rating"])
+        # Merging delta rows loses the categorical subject/level columns of the base
+        categorical = {column: "category" for column in catalog.columns if CSV_DTYPES.get(column) == "category"}
+        data = prepare(catalog.astype(categorical))
+        # Indexes saved before max_features was recorded: the build default, or the
+        # vocabulary size if that is larger
+        max_features = index.vectorizer.max_features or max(2000, index.tfidf_f.shape[1])
+        vectorizer, wv, tfidf_f, w2v_f = build_features(data, max_features, index.w2v_f.shape[1])
+        ivf = None
+        if isinstance(index.searcher, IVFSearcher):
+            ivf = build_ivf(tfidf_f, w2v_f, index.searcher.nlist)
+
+        root = os.path.dirname(index.path)
+        version = save_index(root, data, vectorizer, wv, tfidf_f, w2v_f,
+                             source=f"compaction of {index.version}", ivf=ivf, precision=index.precision,
+                             max_features=max_features)
+        compacted = load_index(root, version, search="ivf" if ivf is not None else "exact")
+
+        with write_lock:
+            upserts, deletes = pending_changes(holder.get(), since=index)
+            if len(upserts) or deletes:
+                compacted = compacted.with_changes(upserts, deletes)
+            holder.swap(compacted)
+        return compacted
+
+
+def start_compaction(interval=COMPACTION_INTERVAL):
+    """Compact in a background thread every `interval` seconds while there are changes."""
+    global _compactor
+    if interval <= 0 or _compactor is not None:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                compact()
+            except Exception as e:
+                print("Error in index compaction:", str(e))
+
+    _compactor = threading.Thread(target=run, name="index-compaction", daemon=True)
+    _compactor.start()
+
+
+def pending_changes(index, since=None):
+    """Admin changes not yet compacted into the base, as (upserts, deleted course ids).
+
+    With `since`, an earlier index derived from the same base, only the changes
+    made after it.
+    """
+    start = len(since) if since is not None else index.base_rows
+    alive = ~np.isin(np.arange(start, len(index)), index.deleted)
+    upserts = index.delta_catalog.iloc[start - index.base_rows:][alive].drop(columns=["popularity_rating"])
+    deleted = index.deleted[index.deleted < start]
+    if since is not None:
+        deleted = np.setdiff1d(deleted, since.deleted)
+    deletes = set(index.rows_frame(deleted)["course_id"].astype(str)) - set(upserts["course_id"].astype(str))
+    return upserts, sorted(deletes)
+
+
+def reload(version=None):
+    """Serve `version` (default: the one LATEST points at) of the current index root.
+
+    Pending admin changes are replayed onto the new version so they are not
+    lost. Returns the index being served afterwards.
+    """
+    with version_lock, write_lock:
+        index = holder.get()
+        root = os.path.dirname(index.path)
+        version = version or latest_version(root)
+        if os.path.basename(version) != version:
+            raise ValueError(f"Invalid index version {version!r}")
+        if version == index.base_version:
+            return index
+
+        loaded = load_index(root, version)
+        upserts, deletes = pending_changes(index)
+        if len(upserts) or deletes:
+            loaded = loaded.with_changes(upserts, deletes)
+        holder.swap(loaded)
+        print(f"Serving course index {loaded.version} (was {index.version})")
+        return loaded
+
+
+def start_watcher(interval=WATCH_INTERVAL):
+    """Reload in a background thread whenever LATEST is repointed.
+
+    Only changes of the pointer trigger a reload, so a version selected
+    explicitly through /admin/reload stays until the next build.
+    """
+    global _watcher
+    if interval <= 0 or _watcher is not None:
+        return
+
+    def run():
+        seen = None
+        while True:
+            try:
+                if seen is None:
+                    # The initial load, retried until a first build exists
+                    seen = holder.get().base_version
+                latest = latest_version(INDEX_DIR)
+                if latest != seen:
+                    seen = latest
+                    reload(latest)
+            except Exception as e:
+                # A half-copied or broken build keeps the current index serving
+                print("Error reloading course index:", str(e))
+            time.sleep(interval)
+
+    _watcher = threading.Thread(target=run, name="index-watcher", daemon=True)
+    _watcher.start()
+
+
+def status(index):
+    return {
+        "version": index.version,
+        "base_version": index.base_version,
+        "base_rows": index.base_rows,
+        "delta_rows": len(index.delta_catalog),
+        "deleted_rows": len(index.deleted),
+        "live_rows": index.live_rows,
+        "changes": index.changes,
+    }
+
+
+@admin.route("/status")
+@admin_required
+def index_status():
+    return jsonify(status(holder.get()))
+
+
+@admin.route("/courses", methods=["POST"])
+@admin_required
+@single_process
+def upsert_courses():
+    """Add courses, or replace existing ones with the same course_id."""
+    input_data = request.json
+    courses = input_data.get("courses", [input_data]) if isinstance(input_data, dict) else input_data
+    if not isinstance(courses, list) or not courses:
+        return jsonify({"error": "Expected a course or a list of courses"}), 400
+    try:
+        index = apply_changes(upserts=to_frame(holder.get(), courses))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(status(index)), 201
+
+
+@admin.route("/courses/<course_id>", methods=["PUT"])
+@admin_required
+@single_process
+def update_course(course_id):
+    """Update some fields of a course; the rest keep their current values."""
+    index = holder.get()
+    row = index.find(course_id)
+    if row is None:
+        return jsonify({"error": "Course not found"}), 404
+    current = index.rows_frame(np.array([row])).iloc[0].to_dict()
+    course = {**current, **(request.json or {}), "course_id": current["course_id"]}
+    try:
+        index = apply_changes(upserts=to_frame(index, [course]))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(status(index))
+
+
+@admin.route("/courses/<course_id>", methods=["DELETE"])
+@admin_required
+@single_process
+def delete_course(course_id):
+    if holder.get().find(course_id) is None:
+        return jsonify({"error": "Course not found"}), 404
+    return jsonify(status(apply_changes(deletes=[course_id])))
+
+
+@admin.route("/reload", methods=["POST"])
+@admin_required
+@single_process
+def reload_index():
+    """Switch to a newly built index version: {"version": ...}, or LATEST if omitted."""
+    version = (request.get_json(silent=True) or {}).get("version")
+    try:
+        return jsonify(status(reload(version)))
+    except (FileNotFoundError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("Error reloading course index:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@admin.route("/compact", methods=["POST"])
+@admin_required
+@single_process
+def compact_index():
+    try:
+        return jsonify(status(compact()))
+    except Exception as e:
+        print("Error in index compaction:", str(e))
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from scipy import sparse
+from .metrics import timer
+
+# Approximate nearest-neighbour search over the normalized course features.
+#
+# IVF ("inverted file") index in pure NumPy: spherical k-means splits the
+# catalog into `nlist` clusters, and a query is scored exactly against only
+# the rows of its `nprobe` closest clusters. nprobe is the recall-vs-latency
+# knob; nprobe == nlist is equivalent to exact search.
+#
+# Files, stored next to the features of the index version they belong to:
+#   ivf.json, ivf_centroids_tfidf.npy, ivf_centroids_w2v.npy, ivf_offsets.npy, ivf_rows.npy
+
+NPROBE = int(os.getenv("COURSE_INDEX_NPROBE", "8"))
+
+# Upper bound on the (rows x clusters) similarity block held in memory while assigning
+ASSIGN_BLOCK_SIZE = 1 << 24
+
+
+class IVFSearcher:
+    def __init__(self, centroids_tfidf, centroids_w2v, offsets, rows, nprobe=NPROBE):
+        self.centroids_tfidf = centroids_tfidf
+        self.centroids_w2v = centroids_w2v
+        self.offsets = offsets
+        self.rows = rows
+        self.nprobe = nprobe
+
+    @property
+    def nlist(self):
+        return len(self.offsets) - 1
+
+    def with_nprobe(self, nprobe):
+        return IVFSearcher(self.centroids_tfidf, self.centroids_w2v, self.offsets, self.rows, nprobe)
+
+    def candidates(self, tfidf_title, w2vec_title):
+        """Catalog rows in the nprobe clusters closest to the query, in ascending order."""
+        sims = self.centroids_tfidf @ tfidf_title + self.centroids_w2v @ w2vec_title
+        nprobe = min(self.nprobe, self.nlist)
+        lists = np.argpartition(-sims, nprobe - 1)[:nprobe]
+        rows = np.concatenate([self.rows[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+        rows.sort()  # sequential access into the CSR/mmap arrays
+        return rows
+
+    def search(self, index, tfidf_title, w2vec_title, k, rows=None):
+        """Candidate rows and their scores; `rows` restricts the search to filtered rows."""
+        if rows is not None and len(rows) <= len(self.rows) * self.nprobe / self.nlist:
+            # The filter is already narrower than the probed clusters: score it exactly
+            return rows, index.score(tfidf_title, w2vec_title, rows)
+
+        with timer("ivf_probe"):
+            candidates = self.candidates(tfidf_title, w2vec_title)
+        if len(index) > index.base_rows:
+            # Courses added since the build are not clustered; always score them
+            candidates = np.concatenate([candidates, np.arange(index.base_rows, len(index))])
+        if rows is not None:
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+        if len(candidates) < k:
+            # Probed clusters too small to fill k: fall back to the exact path
+            return rows, index.score(tfidf_title, w2vec_title, rows)
+        return candidates, index.score(tfidf_title, w2vec_title, candidates)
+
+    def search_batch(self, index, tfidf_titles, w2vec_titles, k, rows=None):
+        for tfidf_title, w2vec_title in zip(tfidf_titles, w2vec_titles):
+            yield self.search(index, tfidf_title, w2vec_title, k, rows)
+
+
+def _assign(tfidf_f, w2v_f, centroids_tfidf, centroids_w2v):
+    """Closest centroid for every row, computed in bounded blocks."""
+    n = w2v_f.shape[0]
+    block = max(1, ASSIGN_BLOCK_SIZE // len(centroids_w2v))
+    assign = np.empty(n, dtype=np.int32)
+    for start in range(0, n, block):
+        stop = min(n, start + block)
+        sims = tfidf_f[start:stop] @ centroids_tfidf.T + np.asarray(w2v_f[start:stop]) @ centroids_w2v.T
+        assign[start:stop] = np.argmax(sims, axis=1)
+    return assign
+
+
+def _update(tfidf_f, w2v_f, assign, centroids_tfidf, centroids_w2v):
+    """Mean direction of each cluster; empty clusters keep their previous centroid."""
+    nlist = len(centroids_w2v)
+    members = sparse.csr_matrix((np.ones(len(assign)), (np.arange(len(assign)), assign)),
+                                shape=(len(assign), nlist))
+    sums_tfidf = (members.T @ tfidf_f).toarray()
+    sums_w2v = members.T @ w2v_f
+    norm = np.sqrt(np.einsum("ij,ij->i", sums_tfidf, sums_tfidf)
+                   + np.einsum("ij,ij->i", sums_w2v, sums_w2v))
+    filled = norm > 0
+    centroids_tfidf = centroids_tfidf.copy()
+    centroids_w2v = centroids_w2v.copy()
+    centroids_tfidf[filled] = sums_tfidf[filled] / norm[filled, None]
+    centroids_w2v[filled] = sums_w2v[filled] / norm[filled, None]
+    return centroids_tfidf, centroids_w2v
+
+
+def build_ivf(tfidf_f, w2v_f, nlist, iterations=10, sample_size=100_000, seed=42, nprobe=NPROBE):
+    """Train spherical k-means on a sample of rows, then assign the whole catalog."""
+    rng = np.random.default_rng(seed)
+    n = w2v_f.shape[0]
+    nlist = max(1, min(nlist, n))
+
+    sample = np.sort(rng.choice(n, min(n, max(sample_size, nlist)), replace=False))
+    sample_tfidf = sparse.csr_matrix(tfidf_f[sample])
+    sample_w2v = np.asarray(w2v_f[sample])
+    init = rng.choice(len(sample), nlist, replace=False)
+    centroids_tfidf = sample_tfidf[init].toarray()
+    centroids_w2v = sample_w2v[init].copy()
+    for _ in range(iterations):
+        assign = _assign(sample_tfidf, sample_w2v, centroids_tfidf, centroids_w2v)
+        centroids_tfidf, centroids_w2v = _update(sample_tfidf, sample_w2v, assign,
+                                                 centroids_tfidf, centroids_w2v)
+
+    assign = _assign(tfidf_f, w2v_f, centroids_tfidf, centroids_w2v)
+    rows = np.argsort(assign, kind="stable").astype(np.int32)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+    return IVFSearcher(centroids_tfidf.astype(np.float32), centroids_w2v.astype(np.float32),
+                       offsets, rows, nprobe)
+
+
+def save_ivf(path, ivf, iterations=None):
+    np.save(os.path.join(path, "ivf_centroids_tfidf.npy"), ivf.centroids_tfidf)
+    np.save(os.path.join(path, "ivf_centroids_w2v.npy"), ivf.centroids_w2v)
+    np.save(os.path.join(path, "ivf_offsets.npy"), ivf.offsets)
+    np.save(os.path.join(path, "ivf_rows.npy"), ivf.rows)
+    with open(os.path.join(path, "ivf.json"), "w", encoding="utf-8") as f:
+        json.dump({"nlist": ivf.nlist, "iterations": iterations,
+                   "created": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+
+
+def load_ivf(path, nprobe=NPROBE):
+    """The IVF index stored in an index version directory, or None if it has none."""
+    if not os.path.exists(os.path.join(path, "ivf.json")):
+        return None
+    load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+    return IVFSearcher(load("ivf_centroids_tfidf.npy"), load("ivf_centroids_w2v.npy"),
+                       load("ivf_offsets.npy"), load("ivf_rows.npy"), nprobe)
+
+
+def evaluate(index, ivf, titles, k=5, nprobes=(1, 2, 4, 8, 16, 32)):
+    """Recall@k and latency of the IVF path against exact search for each nprobe."""
+    def timed_search(search):
+        latencies, results = [], []
+        for title in titles:
+            start = time.perf_counter()
+            tfidf_title, w2vec_title = index.vectorize(title)
+            rows, scores = search(tfidf_title, w2vec_title)
+            results.append(set(index.select(rows, scores, k)[0].tolist()))
+            latencies.append((time.perf_counter() - start) * 1000)
+        return results, latencies
+
+    def summary(latencies):
+        return {"p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 3)}
+
+    exact, latencies = timed_search(lambda t, w: (None, index.score(t, w)))
+    report = [{"nprobe": "exact", "recall": 1.0, **summary(latencies)}]
+    for nprobe in nprobes:
+        probe = ivf.with_nprobe(nprobe)
+        found, latencies = timed_search(lambda t, w: probe.search(index, t, w, k))
+        recall = np.mean([len(a & b) / len(b) for a, b in zip(found, exact)])
+        report.append({"nprobe": nprobe, "recall": round(float(recall), 4), **summary(latencies)})
+    return report
+
+
+def main():
+    from .index import INDEX_DIR, load_index
+
+    parser = argparse.ArgumentParser(description="Build or evaluate the IVF index of a course index version")
+    parser.add_argument("command", choices=["build", "eval"])
+    parser.add_argument("--root", default=INDEX_DIR, help="index root directory")
+    parser.add_argument("--version", help="index version (default: LATEST)")
+    parser.add_argument("--lists", type=int, help="number of clusters (default: sqrt of the catalog size)")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="catalog titles sampled as eval queries")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    index = load_index(args.root, args.version, search="exact")
+    if args.command == "build":
+        nlist = args.lists or int(np.sqrt(len(index)))
+        ivf = build_ivf(index.tfidf_f, index.w2v_f, nlist, args.iterations)
+        save_ivf(index.path, ivf, args.iterations)
+        print(f"Built IVF index with {ivf.nlist} lists for {index.version}")
+    else:
+        ivf = load_ivf(index.path)
+        if ivf is None:
+            raise SystemExit(f"Index {index.version} has no IVF index; run `python -m app.ann build` first")
+        rng = np.random.default_rng(0)
+        sample = rng.choice(len(index), min(args.queries, len(index)), replace=False)
+        titles = index.catalog["course_title"].astype(str).iloc[sample].tolist()
+        for row in evaluate(index, ivf, titles, args.k, args.nprobe):
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Recommendation result cache.
+#
+# Entries are keyed by (normalized title, k, filters) and tagged with the
+# index version they were computed from: the first lookup against a new
+# version drops everything cached for the old one.
+
+CACHE_SIZE = int(os.getenv("RECOMMEND_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.getenv("RECOMMEND_CACHE_TTL", "600"))
+
+
+def normalize_title(title):
+    # Only whitespace is normalized: the Word2Vec half of the query is case
+    # sensitive, so "Python" and "python" can rank differently.
+    return " ".join(title.split())
+
+
+def cache_key(title, k, filters=None):
+    filters = ((name, tuple(value) if isinstance(value, list) else value)
+               for name, value in (filters or {}).items())
+    return normalize_title(title), k, tuple(sorted(filters))
+
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self.version is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+
+    def get(self, version, key):
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, version, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            # A slow request may finish after the index moved on; don't cache its result
+            if version != self.version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# Pre-filtering for recommendations.
+#
+# Built once per index load: categorical attributes (subject, level) get a
+# sorted row-id posting list per value, numeric attributes (price,
+# subscribers) get their rows sorted by value so a range is a slice. A
+# query starts from the most selective predicate's rows and checks the rest
+# on just those rows, so selective filters cost proportionally less and
+# similarity is only computed for the rows that survive.
+
+CATEGORICAL = ("subject", "level")
+NUMERIC = ("price", "num_subscribers")
+
+
+def parse_filters(raw):
+    """Validated filters from a request body, as a dict of plain values.
+
+    Accepted keys: subject and level (a value or list of values), min_price,
+    max_price, paid (bool) and min_subscribers.
+    """
+    if raw is None:
+        return {}
+    if not isinstance(raw, dict):
+        raise ValueError("filters must be an object")
+    unknown = set(raw) - {"subject", "level", "min_price", "max_price", "paid", "min_subscribers"}
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+
+    filters = {}
+    for name in CATEGORICAL:
+        if raw.get(name) is not None:
+            values = raw[name] if isinstance(raw[name], list) else [raw[name]]
+            if not values or not all(isinstance(value, str) for value in values):
+                raise ValueError(f"{name} must be a string or a list of strings")
+            filters[name] = sorted(set(values))
+    for name in ("min_price", "max_price", "min_subscribers"):
+        if raw.get(name) is not None:
+            if isinstance(raw[name], bool) or not isinstance(raw[name], (int, float)):
+                raise ValueError(f"{name} must be a number")
+            filters[name] = raw[name]
+    if raw.get("paid") is not None:
+        if not isinstance(raw["paid"], bool):
+            raise ValueError("paid must be true or false")
+        filters["paid"] = raw["paid"]
+    return filters
+
+
+def _ranges(filters):
+    """Inclusive (low, high) bounds per numeric column."""
+    ranges = {}
+    low, high = filters.get("min_price", -np.inf), filters.get("max_price", np.inf)
+    if filters.get("paid") is True:
+        low = max(low, np.nextafter(0.0, 1.0))
+    elif filters.get("paid") is False:
+        high = min(high, 0.0)
+    if low != -np.inf or high != np.inf:
+        ranges["price"] = (low, high)
+    if "min_subscribers" in filters:
+        ranges["num_subscribers"] = (filters["min_subscribers"], np.inf)
+    return ranges
+
+
+def matches(catalog, filters):
+    """Boolean mask of the rows of `catalog` that satisfy `filters` (no index needed)."""
+    mask = np.ones(len(catalog), dtype=bool)
+    for name in CATEGORICAL:
+        if name in filters:
+            mask &= catalog[name].isin(filters[name]).to_numpy()
+    for name, (low, high) in _ranges(filters).items():
+        values = pd.to_numeric(catalog[name], errors="coerce").fillna(0).to_numpy()
+        mask &= (values >= low) & (values <= high)
+    return mask
+
+
+class FilterIndex:
+    def __init__(self, catalog):
+        self.rows = len(catalog)
+        self.codes = {}
+        self.categories = {}
+        self.postings = {}
+        for name in CATEGORICAL:
+            codes, categories = pd.factorize(catalog[name].astype(str))
+            order = np.argsort(codes, kind="stable").astype(np.int32)
+            bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1))
+            self.codes[name] = codes
+            self.categories[name] = {value: code for code, value in enumerate(categories)}
+            self.postings[name] = [order[bounds[i]:bounds[i + 1]] for i in range(len(categories))]
+
+        self.values = {}
+        self.order = {}
+        self.sorted_values = {}
+        for name in NUMERIC:
+            values = pd.to_numeric(catalog[name], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+            order = np.argsort(values, kind="stable").astype(np.int32)
+            self.values[name] = values
+            self.order[name] = order
+            self.sorted_values[name] = values[order]
+
+    def _predicates(self, filters):
+        """(estimated size, rows generator, row check) for each active filter."""
+        predicates = []
+        for name in CATEGORICAL:
+            if name in filters:
+                codes = [self.categories[name][value] for value in filters[name] if value in self.categories[name]]
+                lists = [self.postings[name][code] for code in codes]
+                predicates.append((
+                    sum(len(rows) for rows in lists),
+                    lambda lists=lists: np.sort(np.concatenate(lists)) if lists else np.zeros(0, dtype=np.int32),
+                    lambda rows, name=name, codes=codes: np.isin(self.codes[name][rows], codes),
+                ))
+        for name, (low, high) in _ranges(filters).items():
+            start = np.searchsorted(self.sorted_values[name], low, side="left")
+            stop = np.searchsorted(self.sorted_values[name], high, side="right")
+            predicates.append((
+                max(0, stop - start),
+                lambda name=name, start=start, stop=stop: np.sort(self.order[name][start:stop]),
+                lambda rows, name=name, low=low, high=high: (self.values[name][rows] >= low)
+                & (self.values[name][rows] <= high),
+            ))
+        return predicates
+
+    def candidates(self, filters):
+        """Sorted row ids matching every filter, or None when there are no filters."""
+        predicates = self._predicates(filters)
+        if not predicates:
+            return None
+        predicates.sort(key=lambda predicate: predicate[0])
+        rows = predicates[0][1]()
+        for _size, _rows, check in predicates[1:]:
+            if not len(rows):
+                break
+            rows = rows[check(rows)]
+        return rows.astype(np.int64)
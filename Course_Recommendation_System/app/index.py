@@ -0,0 +1,570 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+from .ann import load_ivf, save_ivf
+from .filters import FilterIndex, matches
+from .metrics import timer
+from .quantize import QuantizedMatrix, quantize, quantize_sparse
+from .suggest import PrefixIndex, title_matches, tokenize
+
+# Versioned on-disk course index.
+#
+# Layout:
+#   <root>/LATEST                                     name of the version to serve
+#   <root>/<version>/manifest.json
+#   <root>/<version>/vocabulary.json, idf.npy         fitted TF-IDF vectorizer
+#   <root>/<version>/wv_keys.json, wv_vectors.npy     Word2Vec keyed vectors
+#   <root>/<version>/tfidf_{data,indices,indptr}.npy  TF-IDF half of the features (CSR)
+#   <root>/<version>/w2v_features.npy                 Word2Vec half of the features (dense)
+#   <root>/<version>/w2v_scales.npy                   per-row scales, int8 precision only
+#   <root>/<version>/catalog.pkl                      course rows used in responses
+#
+# Both feature halves are scaled by the norm of the combined row, so the
+# cosine similarity against a normalized query is the sum of a sparse and a
+# dense dot product. Arrays are memory-mapped on load, so every worker on a
+# host shares one page-cached copy and startup does no model fitting. The
+# features can be stored in reduced precision (see quantize.py).
+
+FORMAT_VERSION = 3
+INDEX_DIR = os.getenv("COURSE_INDEX_DIR", "data/index")
+
+# "exact" scores every row; "ivf" uses the version's ANN index; "auto" uses it when one was built
+SEARCH_MODE = os.getenv("COURSE_INDEX_SEARCH", "auto")
+
+# Upper bound on the (queries x courses) score block held in memory at once
+SCORE_BLOCK_SIZE = 1 << 24
+
+# Serializes the lazy build of typeahead indexes
+_prefix_lock = threading.Lock()
+
+
+class IndexHolder:
+    """Reference to the index currently being served.
+
+    Handlers call `get()` once per request and use that snapshot throughout;
+    `swap()` publishes a new index atomically, and requests already running
+    finish on the one they started with.
+
+    With a `loader` the index is loaded on the first `get()` (or by
+    `warmup()` in the background), so importing the app does no work.
+    Requests arriving while it loads wait for it.
+    """
+
+    def __init__(self, index=None, loader=None):
+        self._index = index
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._warmup = None
+        self.error = None
+
+    @property
+    def ready(self):
+        return self._index is not None
+
+    def get(self):
+        index = self._index
+        return index if index is not None else self.load()
+
+    def load(self):
+        with self._lock:
+            if self._index is None:
+                start = time.perf_counter()
+                try:
+                    index = self._loader()
+                except Exception as e:
+                    self.error = e
+                    raise
+                self.error = None
+                self._index = index
+                print(f"Loaded course index {index.version} in {time.perf_counter() - start:.2f}s")
+            return self._index
+
+    def swap(self, index):
+        self._index = index
+
+    def warmup(self):
+        """Load the index in a background thread, unless it is loaded or already loading there."""
+        if self.ready or (self._warmup is not None and self._warmup.is_alive()):
+            return
+
+        def run():
+            try:
+                self.load()
+            except Exception as e:
+                print("Error loading course index:", str(e))
+
+        self._warmup = threading.Thread(target=run, name="index-warmup", daemon=True)
+        self._warmup.start()
+
+
+class WordVectors:
+    """Read-only stand-in for gensim's KeyedVectors backed by a memory-mapped array."""
+
+    def __init__(self, keys, vectors):
+        self.key_to_index = {key: i for i, key in enumerate(keys)}
+        self.vectors = vectors
+
+
+def popularity_rating(catalog):
+    """Popularity metric on a 0-5 scale, computed for the whole catalog at once."""
+    return np.minimum(5, 0.6 * (catalog["num_subscribers"].to_numpy() / 10000)
+                      + 0.4 * (catalog["num_reviews"].to_numpy() / 500))
+
+
+def top_k(scores, popularity, k):
+    """Positions of the k highest scores, ties broken by popularity.
+
+    np.partition finds the k-th best score in O(n); only rows at or above it
+    (including every row tied at the boundary) are sorted.
+    """
+    n = len(scores)
+    if k < n:
+        kth = np.partition(scores, n - k)[n - k]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((-popularity[candidates], -scores[candidates]))
+    return candidates[order[:k]]
+
+
+class ExactSearcher:
+    """Brute-force search: every row (or every row passing the filters) is scored."""
+
+    def search(self, index, tfidf_title, w2vec_title, k, rows=None):
+        return rows, index.score(tfidf_title, w2vec_title, rows)
+
+    def search_batch(self, index, tfidf_titles, w2vec_titles, k, rows=None):
+        # One sparse and one dense matrix multiply per block of queries
+        block = max(1, SCORE_BLOCK_SIZE // max(1, len(index) if rows is None else len(rows)))
+        for start in range(0, len(tfidf_titles), block):
+            stop = start + block
+            for row_scores in index.score_batch(tfidf_titles[start:stop], w2vec_titles[start:stop], rows):
+                yield rows, row_scores
+
+
+def _read_only(array):
+    view = np.asarray(array).view()
+    view.flags.writeable = False
+    return view
+
+
+def _read_only_csr(matrix):
+    return sparse.csr_matrix(
+        tuple(_read_only(part) for part in (matrix.data, matrix.indices, matrix.indptr)),
+        shape=matrix.shape, copy=False)
+
+
+def normalize_features(tf_idf, word2vec_matrix):
+    """Scale both feature halves by the norm of each combined row.
+
+    The result equals `normalize(hstack([tf_idf, word2vec_matrix]))` without
+    densifying the TF-IDF block.
+    """
+    row_norm = np.sqrt(np.asarray(tf_idf.multiply(tf_idf).sum(axis=1)).ravel()
+                       + np.einsum("ij,ij->i", word2vec_matrix, word2vec_matrix))
+    row_norm[row_norm == 0] = 1.0
+    return sparse.csr_matrix(tf_idf.multiply(1.0 / row_norm[:, None])), word2vec_matrix / row_norm[:, None]
+
+
+def embedding_(texts, wv):
+    """Mean Word2Vec vector of each text's known tokens (zeros if none are known).
+
+    Tokens are mapped to vocabulary indices in one pass, then every mean is
+    computed at once as a sparse (texts x vocabulary) count matrix times the
+    vector table. `wv` is gensim KeyedVectors or a WordVectors.
+    """
+    tokens = pd.Series(list(texts), dtype=object).str.split().explode()
+    ids = tokens.map(wv.key_to_index).dropna()
+    counts = sparse.csr_matrix((np.ones(len(ids)), (ids.index.to_numpy(), ids.to_numpy(dtype=np.int64))),
+                               shape=(len(texts), len(wv.key_to_index)))
+    totals = np.asarray(counts.sum(axis=1)).ravel()
+    totals[totals == 0] = 1.0
+    return (counts @ wv.vectors) / totals[:, None]
+
+
+def course_data(catalog):
+    """Text the features are built from: title and subject."""
+    return catalog["course_title"].astype(str) + " " + catalog["subject"].astype(str)
+
+
+class CourseIndex:
+    """Everything needed to answer a query, immutable once constructed.
+
+    Request handlers only read from the index and keep their scores in local
+    arrays, so one instance can serve any number of threads concurrently.
+
+    Row ids 0..base_rows-1 are the memory-mapped base catalog. Courses added
+    through `with_changes` get ids after it in a small in-memory delta, and
+    replaced or removed rows are tombstoned in `deleted` until the next
+    compaction rebuilds the base.
+    """
+
+    def __init__(self, version, catalog, vectorizer, wv, tfidf_f, w2v_f, searcher=None, path=None):
+        self.version = version
+        self.path = path
+        self.searcher = searcher or ExactSearcher()
+        self.vectorizer = vectorizer
+        self.wv = wv
+        self.tfidf_f = _read_only_csr(tfidf_f)
+        self.w2v_f = w2v_f if isinstance(w2v_f, QuantizedMatrix) else _read_only(w2v_f)
+        # Queries are scored in float32 against reduced-precision features
+        self.dtype = np.float64 if self.precision == "float64" else np.float32
+        self.popularity = _read_only(popularity_rating(catalog))
+        self.catalog = catalog.assign(popularity_rating=self.popularity)
+        self.base_rows = len(catalog)
+        self.filters = FilterIndex(self.catalog)
+
+        # Incremental changes since the base was built
+        self.base_version = version
+        self.changes = 0
+        self.delta_catalog = self.catalog.iloc[:0]
+        self.delta_tfidf = sparse.csr_matrix((0, self.tfidf_f.shape[1]), dtype=self.dtype)
+        self.delta_w2v = np.zeros((0, self.w2v_f.shape[1]), dtype=self.dtype)
+        self.delta_ids = {}
+        self.deleted = np.zeros(0, dtype=np.int64)
+        # Shared by every index derived from this base, built on first use
+        self._base_ids = {}
+        self._prefixes = []
+
+    def __len__(self):
+        return self.base_rows + len(self.delta_catalog)
+
+    @property
+    def live_rows(self):
+        return len(self) - len(self.deleted)
+
+    @property
+    def precision(self):
+        """Storage precision of the features: float64, float32, float16 or int8."""
+        return getattr(self.w2v_f, "precision", self.w2v_f.dtype.name)
+
+    def vectorize_batch(self, titles):
+        """TF-IDF and Word2Vec halves of the normalized query vectors, one row per title."""
+        with timer("tfidf_transform"):
+            tfidf_titles = self.vectorizer.transform(titles)
+        with timer("embedding"):
+            w2vec_titles = embedding_(titles, self.wv)
+        with timer("normalize"):
+            tfidf_titles, w2vec_titles = normalize(tfidf_titles), normalize(w2vec_titles)
+            # Rescale so each concatenated query has unit norm, as cosine_similarity would
+            norm = np.sqrt(np.asarray(tfidf_titles.multiply(tfidf_titles).sum(axis=1)).ravel()
+                           + np.einsum("ij,ij->i", w2vec_titles, w2vec_titles))
+            norm[norm == 0] = 1.0
+            return ((tfidf_titles.toarray() / norm[:, None]).astype(self.dtype, copy=False),
+                    (w2vec_titles / norm[:, None]).astype(self.dtype, copy=False))
+
+    def vectorize(self, title):
+        tfidf_titles, w2vec_titles = self.vectorize_batch([title])
+        return tfidf_titles[0], w2vec_titles[0]
+
+    def score(self, tfidf_title, w2vec_title, rows=None):
+        """Cosine similarity of the query against all rows, or only against `rows`.
+
+        `rows` must be in ascending order. Deleted rows score -inf.
+        """
+        # Sparse mat-vec touches only the non-zeros; the 100-d half is dense
+        if rows is None:
+            scores = self.tfidf_f @ tfidf_title + self.w2v_f @ w2vec_title
+            if len(self.delta_catalog):
+                scores = np.concatenate([scores, self.delta_tfidf @ tfidf_title + self.delta_w2v @ w2vec_title])
+            scores[self.deleted] = -np.inf
+            return scores
+
+        split = np.searchsorted(rows, self.base_rows)
+        base, extra = rows[:split], rows[split:] - self.base_rows
+        scores = self.tfidf_f[base] @ tfidf_title + self.w2v_f[base] @ w2vec_title
+        if len(extra):
+            scores = np.concatenate([scores, self.delta_tfidf[extra] @ tfidf_title
+                                     + self.delta_w2v[extra] @ w2vec_title])
+        if len(self.deleted):
+            scores[np.isin(rows, self.deleted)] = -np.inf
+        return scores
+
+    def score_batch(self, tfidf_titles, w2vec_titles, rows=None):
+        """Scores of a block of queries against all rows (or ascending `rows`), one row per query."""
+        if rows is None:
+            scores = (self.tfidf_f @ tfidf_titles.T + self.w2v_f @ w2vec_titles.T).T
+            if len(self.delta_catalog):
+                scores = np.hstack([scores, (self.delta_tfidf @ tfidf_titles.T
+                                             + self.delta_w2v @ w2vec_titles.T).T])
+            scores[:, self.deleted] = -np.inf
+            return scores
+
+        split = np.searchsorted(rows, self.base_rows)
+        base, extra = rows[:split], rows[split:] - self.base_rows
+        scores = (self.tfidf_f[base] @ tfidf_titles.T + self.w2v_f[base] @ w2vec_titles.T).T
+        if len(extra):
+            scores = np.hstack([scores, (self.delta_tfidf[extra] @ tfidf_titles.T
+                                         + self.delta_w2v[extra] @ w2vec_titles.T).T])
+        if len(self.deleted):
+            scores[:, np.isin(rows, self.deleted)] = -np.inf
+        return scores
+
+    def filter_rows(self, filters):
+        """Ascending row ids passing `filters`, or None when there are none."""
+        if not filters:
+            return None
+        rows = self.filters.candidates(filters)
+        if len(self.delta_catalog):
+            extra = np.flatnonzero(matches(self.delta_catalog, filters)) + self.base_rows
+            rows = np.concatenate([rows, extra])
+        return rows
+
+    def similarity(self, title):
+        return self.score(*self.vectorize(title))
+
+    def select(self, rows, scores, k):
+        """Top k of a search result; `rows` is None when `scores` covers the whole catalog."""
+        if rows is None:
+            best = top_k(scores, self.popularity, k)
+        else:
+            best = top_k(scores, self.popularity[rows], k)
+        best = best[np.isfinite(scores[best])]  # never return deleted rows
+        return (best if rows is None else rows[best]), scores[best]
+
+    def recommend(self, title, k=5, filters=None):
+        """Row positions and scores of the k best matches for `title` among rows passing `filters`."""
+        tfidf_title, w2vec_title = self.vectorize(title)
+        with timer("filter"):
+            rows = self.filter_rows(filters)
+        with timer("search"):
+            rows, scores = self.searcher.search(self, tfidf_title, w2vec_title, k, rows)
+        with timer("top_k"):
+            return self.select(rows, scores, k)
+
+    def recommend_batch(self, titles, k=5, filters=None):
+        """`recommend` for many titles, vectorized and searched together."""
+        tfidf_titles, w2vec_titles = self.vectorize_batch(titles)
+        with timer("filter"):
+            rows = self.filter_rows(filters)
+        results = []
+        blocks = self.searcher.search_batch(self, tfidf_titles, w2vec_titles, k, rows)
+        while True:
+            with timer("search"):
+                block = next(blocks, None)
+            if block is None:
+                return results
+            with timer("top_k"):
+                results.append(self.select(*block, k))
+
+    def suggest(self, query, limit=8):
+        """Titles of the most popular live courses with a word starting with each word of `query`.
+
+        Returns (row id, title) pairs, one per distinct title.
+        """
+        prefixes = tokenize(query)
+        if not prefixes:
+            return []
+        if not self._prefixes:
+            with _prefix_lock:
+                if not self._prefixes:
+                    self._prefixes.append(PrefixIndex(self.catalog["course_title"].astype(str),
+                                                      self.popularity[:self.base_rows]))
+
+        extra = np.zeros(0, dtype=np.int64)
+        if len(self.delta_catalog):
+            titles = self.delta_catalog["course_title"].astype(str)
+            extra = np.flatnonzero([title_matches(title, prefixes) for title in titles]) + self.base_rows
+
+        # Extra candidates make up for deleted rows and repeated titles; more are
+        # fetched only when those leave fewer than `limit` suggestions
+        count = 4 * limit
+        while True:
+            base = self._prefixes[0].search(prefixes, count)
+            rows = np.concatenate([base, extra])
+            rows = rows[np.lexsort((rows, -self.popularity[rows]))]
+            if len(self.deleted):
+                rows = rows[~np.isin(rows, self.deleted)]
+
+            suggestions, seen = [], set()
+            for row in rows:
+                if row < self.base_rows:
+                    title = self._prefixes[0].titles[row]
+                else:
+                    title = str(self.delta_catalog["course_title"].iat[row - self.base_rows])
+                if title.lower() not in seen:
+                    seen.add(title.lower())
+                    suggestions.append((int(row), title))
+                    if len(suggestions) == limit:
+                        break
+            if len(suggestions) == limit or len(base) < count:
+                break
+            count *= 4
+        return suggestions
+
+    def rows_frame(self, rows):
+        """Catalog rows for `rows`, in that order, whether they are base or delta rows."""
+        if not len(self.delta_catalog):
+            return self.catalog.iloc[rows]
+        in_base = rows < self.base_rows
+        frame = pd.concat([self.catalog.iloc[rows[in_base]],
+                           self.delta_catalog.iloc[rows[~in_base] - self.base_rows]])
+        order = np.concatenate([np.flatnonzero(in_base), np.flatnonzero(~in_base)])
+        return frame.iloc[np.argsort(order)]
+
+    def live_catalog(self):
+        """Every course that is not deleted, base rows first."""
+        alive = np.ones(len(self), dtype=bool)
+        alive[self.deleted] = False
+        return pd.concat([self.catalog[alive[:self.base_rows]],
+                          self.delta_catalog[alive[self.base_rows:]]], ignore_index=True)
+
+    def find(self, course_id):
+        """Row id of a live course, or None."""
+        key = str(course_id)
+        if key in self.delta_ids:
+            return self.delta_ids[key]
+        if not self._base_ids:
+            self._base_ids.update(zip(self.catalog["course_id"].astype(str), range(self.base_rows)))
+        row = self._base_ids.get(key)
+        if row is None:
+            return None
+        pos = np.searchsorted(self.deleted, row)
+        return None if pos < len(self.deleted) and self.deleted[pos] == row else row
+
+    def with_changes(self, upserts=None, deletes=()):
+        """New index with `upserts` (course rows) added or replaced and `deletes` removed.
+
+        Only the changed rows are vectorized, with the existing TF-IDF and
+        Word2Vec models. This index is left untouched, so requests already
+        using it are unaffected.
+        """
+        upserts = upserts if upserts is not None else self.catalog.iloc[:0]
+        ids = list(deletes) + upserts["course_id"].astype(str).tolist()
+        removed = [row for row in map(self.find, ids) if row is not None]
+
+        derived = copy.copy(self)
+        derived.changes = self.changes + 1
+        derived.version = f"{self.base_version}+{derived.changes}"
+        derived.deleted = _read_only(np.union1d(self.deleted, np.asarray(removed, dtype=np.int64)))
+        derived.delta_ids = {key: row for key, row in self.delta_ids.items() if row not in removed}
+
+        if len(upserts):
+            texts = course_data(upserts).tolist()
+            tfidf_new, w2v_new = normalize_features(self.vectorizer.transform(texts), embedding_(texts, self.wv))
+            tfidf_new, w2v_new = tfidf_new.astype(self.dtype), w2v_new.astype(self.dtype)
+            popularity = popularity_rating(upserts)
+            start = len(self)
+            derived.delta_catalog = pd.concat([self.delta_catalog, upserts.assign(popularity_rating=popularity)],
+                                              ignore_index=True)
+            derived.delta_tfidf = _read_only_csr(sparse.vstack([self.delta_tfidf, tfidf_new], format="csr"))
+            derived.delta_w2v = _read_only(np.vstack([self.delta_w2v, w2v_new]))
+            derived.popularity = _read_only(np.concatenate([self.popularity, popularity]))
+            derived.delta_ids.update(zip(upserts["course_id"].astype(str), range(start, start + len(upserts))))
+        return derived
+
+
+def _write_json(path, obj):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_index(root, catalog, vectorizer, wv, tfidf_f, w2v_f, source="", ivf=None, precision="float64",
+               max_features=None):
+    """Write a new index version under `root` and point LATEST at it.
+
+    `precision` is the storage type of the features (see quantize.py).
+    """
+    tfidf_f = quantize_sparse(tfidf_f, precision)
+    w2v_f = quantize(w2v_f, precision)
+    values = w2v_f.values if isinstance(w2v_f, QuantizedMatrix) else w2v_f
+    # Hashed through the buffer protocol: no copy of a memory-mapped feature file
+    sha = hashlib.sha1(np.ascontiguousarray(values))
+    sha.update(np.ascontiguousarray(tfidf_f.data))
+    digest = sha.hexdigest()[:8]
+    version = time.strftime("%Y%m%dT%H%M%S") + "-" + digest
+    path = os.path.join(root, version)
+    os.makedirs(path, exist_ok=True)
+
+    vocabulary = {term: int(i) for term, i in vectorizer.vocabulary_.items()}
+    _write_json(os.path.join(path, "vocabulary.json"), vocabulary)
+    np.save(os.path.join(path, "idf.npy"), vectorizer.idf_)
+    _write_json(os.path.join(path, "wv_keys.json"), list(wv.index_to_key))
+    np.save(os.path.join(path, "wv_vectors.npy"), wv.vectors)
+    np.save(os.path.join(path, "tfidf_data.npy"), tfidf_f.data)
+    np.save(os.path.join(path, "tfidf_indices.npy"), tfidf_f.indices)
+    np.save(os.path.join(path, "tfidf_indptr.npy"), tfidf_f.indptr)
+    np.save(os.path.join(path, "w2v_features.npy"), values)
+    if isinstance(w2v_f, QuantizedMatrix) and w2v_f.scales is not None:
+        np.save(os.path.join(path, "w2v_scales.npy"), w2v_f.scales)
+    catalog = catalog.drop(columns=["course_data", "popularity_rating"], errors="ignore")
+    catalog.reset_index(drop=True).to_pickle(os.path.join(path, "catalog.pkl"))
+    if ivf is not None:
+        save_ivf(path, ivf)
+
+    # The manifest goes last: a version directory without one is an incomplete build
+    _write_json(os.path.join(path, "manifest.json"), {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source": source,
+        "rows": int(w2v_f.shape[0]),
+        "tfidf_features": len(vocabulary),
+        "max_features": max_features,  # the vocabulary cap a refit (compaction) keeps
+        "tfidf_nnz": int(tfidf_f.nnz),
+        "w2v_dim": int(wv.vectors.shape[1]),
+        "precision": precision,
+    })
+
+    # Atomic pointer swap so readers never see a half-written LATEST
+    tmp = os.path.join(root, "LATEST.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, "LATEST"))
+    return version
+
+
+def latest_version(root=INDEX_DIR):
+    """Version the LATEST pointer of `root` names."""
+    latest = os.path.join(root, "LATEST")
+    if not os.path.exists(latest):
+        raise FileNotFoundError(f"No course index in {root!r}; run `python build_index.py` first")
+    with open(latest, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def load_index(root=INDEX_DIR, version=None, search=SEARCH_MODE):
+    if version is None:
+        version = latest_version(root)
+    path = os.path.join(root, version)
+
+    manifest = _read_json(os.path.join(path, "manifest.json"))
+    if manifest["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"Index {version} has format {manifest['format_version']}, "
+                         f"expected {FORMAT_VERSION}; rebuild it with `python build_index.py`")
+
+    vectorizer = TfidfVectorizer(stop_words="english", max_features=manifest.get("max_features"),
+                                 vocabulary=_read_json(os.path.join(path, "vocabulary.json")))
+    vectorizer.idf_ = np.load(os.path.join(path, "idf.npy"))
+    wv = WordVectors(_read_json(os.path.join(path, "wv_keys.json")),
+                     np.load(os.path.join(path, "wv_vectors.npy"), mmap_mode="r"))
+    tfidf_f = sparse.csr_matrix(
+        tuple(np.load(os.path.join(path, f"tfidf_{part}.npy"), mmap_mode="r")
+              for part in ("data", "indices", "indptr")),
+        shape=(manifest["rows"], manifest["tfidf_features"]), copy=False)
+    w2v_f = np.load(os.path.join(path, "w2v_features.npy"), mmap_mode="r")
+    precision = manifest.get("precision", "float64")
+    if precision in ("float16", "int8"):
+        scales = np.load(os.path.join(path, "w2v_scales.npy"), mmap_mode="r") if precision == "int8" else None
+        w2v_f = QuantizedMatrix(w2v_f, scales)
+    catalog = pd.read_pickle(os.path.join(path, "catalog.pkl"))
+
+    searcher = None
+    if search != "exact":
+        searcher = load_ivf(path)
+        if searcher is None and search == "ivf":
+            raise FileNotFoundError(f"Index {version} has no IVF index; run `python -m app.ann build`")
+    return CourseIndex(version, catalog, vectorizer, wv, tfidf_f, w2v_f, searcher, path)
@@ -0,0 +1,135 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Recommender metrics in the Prometheus text format, without a client library.
+#
+# `timer(stage)` records how long a pipeline stage took into the
+# recommend_stage_seconds histogram; request latency and counts are recorded
+# per endpoint by the main blueprint. With RECOMMEND_METRICS=0 every timer is
+# a shared no-op context manager and /metrics is not served. Values are per
+# process: with serve.py each worker reports its own.
+
+ENABLED = os.getenv("RECOMMEND_METRICS", "1") != "0"
+
+# Seconds; stages run from tens of microseconds (top-k) to tens of milliseconds (scoring)
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(names, values):
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, seconds):
+        """Record one observation; `labels` is a tuple of label values."""
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket (not cumulative) counts, then sum and count
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[bucket] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket"
+                             f"{_labels(self.label_names + ('le',), labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-2]:.9f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(f"{self.name}{_labels(self.label_names, labels)} {value}" for labels, value in values)
+        return lines
+
+
+def gauge(name, help_text, samples, label_names=(), metric_type="gauge"):
+    """Lines for a value read at scrape time; `samples` maps label tuples to values.
+
+    Totals kept elsewhere (like the result cache's counters) pass metric_type="counter".
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines.extend(f"{name}{_labels(label_names, labels)} {value}" for labels, value in samples.items())
+    return lines
+
+
+STAGES = Histogram("recommend_stage_seconds", "Time spent in each recommendation pipeline stage.", ("stage",))
+REQUESTS = Histogram("recommend_request_seconds", "Request latency by endpoint.", ("endpoint",))
+REQUEST_COUNT = Counter("recommend_requests_total", "Requests by endpoint and status code.", ("endpoint", "status"))
+
+
+class _Timer:
+    __slots__ = ("labels", "start")
+
+    def __init__(self, stage):
+        self.labels = (stage,)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        STAGES.observe(self.labels, time.perf_counter() - self.start)
+
+
+_NO_TIMER = nullcontext()
+
+
+def timer(stage):
+    """Context manager timing one pipeline stage (a no-op when metrics are disabled)."""
+    return _Timer(stage) if ENABLED else _NO_TIMER
+
+
+def observe_request(endpoint, status, seconds):
+    REQUESTS.observe((endpoint,), seconds)
+    REQUEST_COUNT.inc((endpoint, str(status)))
+
+
+def render(*extra):
+    """The exposition text: the recorded metrics followed by `extra` lists of lines."""
+    lines = STAGES.render() + REQUESTS.render() + REQUEST_COUNT.render()
+    for group in extra:
+        lines.extend(group)
+    return "\n".join(lines) + "\n"
@@ -1,31 +1,157 @@
+import itertools
+import os
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+from pandas.api.types import union_categoricals
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
 from gensim.models import Word2Vec
-import numpy as np
+from gensim.models.word2vec import LineSentence
+from .index import course_data, embedding_, normalize_features
+
+# Offline feature building. Nothing here runs at import time: `build_index.py`
+# fits the models once and writes them to disk with `app.index.save_index`.
+
+# Declared types of the catalog CSV, so pandas never infers object columns
+# for numbers or stores the repeated subject/level strings per row
+CSV_DTYPES = {
+    "course_id": "int64",
+    "course_title": str,
+    "url": str,
+    "is_paid": str,
+    "price": "int32",
+    "num_subscribers": "int32",
+    "num_reviews": "int32",
+    "num_lectures": "int32",
+    "level": "category",
+    "content_duration": "float32",
+    "published_timestamp": str,
+    "subject": "category",
+}
+
+# Columns kept in the index: what responses, filters and the admin API use
+CATALOG_COLUMNS = ["course_id", "course_title", "subject", "level", "price",
+                   "num_subscribers", "num_reviews", "published_timestamp"]
+
+def prepare(data):
+    data = data.reset_index(drop=True)
+    data["course_data"] = course_data(data)
+    return data
+
+def catalog_columns(data):
+    return data[[column for column in CATALOG_COLUMNS if column in data.columns]]
+
+def load_data(csv_path="data/udemy_courses.csv"):
+    data = pd.read_csv(csv_path, dtype=CSV_DTYPES)
+    data.drop_duplicates(inplace=True)
+    return prepare(catalog_columns(data))
+
+def build_features(data, max_features=2000, vector_size=100, seed=42):
+    """Fit TF-IDF and Word2Vec on the catalog.
+
+    Returns the vectorizer, the keyed vectors and the two halves of the
+    row-normalized feature matrix: TF-IDF as CSR and Word2Vec as a dense array.
+    """
+    # TF-IDF Vectorization
+    vectorizer = TfidfVectorizer(stop_words="english", max_features=max_features)
+    tf_idf = vectorizer.fit_transform(data["course_data"])
+
+    # Word2Vec Model (seeded so rebuilds of the same catalog stay comparable)
+    tokenized_courses = data["course_data"].apply(lambda x: x.split())
+    w2vec = Word2Vec(sentences=tokenized_courses, vector_size=vector_size, window=5,
+                     min_count=1, workers=4, seed=seed)
+
+    # Apply Embeddings (one sparse matrix product for the whole catalog)
+    word2vec_matrix = embedding_(data["course_data"], w2vec.wv)
+
+    # Normalize each row by the norm of its combined vector so serving is a plain dot product
+    tfidf_f, w2v_f = normalize_features(tf_idf, word2vec_matrix)
+    return vectorizer, w2vec.wv, tfidf_f, w2v_f
+
+def _fit_tfidf(term_counts, doc_counts, n_docs, max_features):
+    """TfidfVectorizer equivalent to fitting on all documents, from per-term totals.
+
+    Terms are ranked exactly like scikit-learn's `max_features`: by total
+    count over the alphabetically sorted vocabulary.
+    """
+    term_counts = term_counts.sort_index()
+    counts = term_counts.to_numpy(dtype=np.int64)
+    keep = np.ones(len(counts), dtype=bool)
+    if max_features is not None and len(counts) > max_features:
+        keep[:] = False
+        keep[(-counts).argsort()[:max_features]] = True
+    terms = term_counts.index[keep]
+
+    vectorizer = TfidfVectorizer(stop_words="english", vocabulary={term: i for i, term in enumerate(terms)})
+    df = doc_counts[terms].to_numpy(dtype=np.float64)
+    vectorizer.idf_ = np.log((n_docs + 1) / (df + 1)) + 1
+    return vectorizer
 
-# Load dataset
-data = pd.read_csv("data/udemy_courses.csv")
-data.drop_duplicates(inplace=True)
-data["course_data"] = data["course_title"].astype(str) + " " + data["subject"].astype(str)
-data.drop(["course_id", "is_paid"], axis=1, inplace=True)
+def stream_features(csv_path, work_dir, chunk_size=100_000, max_features=2000, vector_size=100, seed=42):
+    """`load_data` + `build_features` for catalogs too large to hold in memory.
 
-# TF-IDF Vectorization
-vectorizer = TfidfVectorizer(stop_words="english", max_features=2000)
-tf_idf = vectorizer.fit_transform(data["course_data"])
+    Pass 1 reads the CSV in typed chunks, drops duplicate rows, keeps the
+    catalog columns, counts TF-IDF terms and writes the course texts to a
+    corpus file in `work_dir` that Word2Vec trains from. Pass 2 vectorizes the
+    corpus chunk by chunk into a memory-mapped feature file in `work_dir`,
+    which must outlive the returned arrays. Returns the catalog, vectorizer,
+    keyed vectors and the two feature halves.
+    """
+    corpus_path = os.path.join(work_dir, "corpus.txt")
+    counter = CountVectorizer(stop_words="english")
+    term_counts = doc_counts = pd.Series(dtype=np.float64)
+    seen = np.zeros(0, dtype=np.uint64)
+    frames = []
+    with open(corpus_path, "w", encoding="utf-8") as corpus:
+        for chunk in pd.read_csv(csv_path, dtype=CSV_DTYPES, chunksize=chunk_size):
+            # Whole-row duplicates, within the chunk and against earlier chunks
+            hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            _, first = np.unique(hashes, return_index=True)
+            first = np.sort(first)
+            first = first[~np.isin(hashes[first], seen)]
+            seen = np.union1d(seen, hashes[first])
+            chunk = catalog_columns(chunk.iloc[first]).reset_index(drop=True)
 
-# Word2Vec Model
-tokenized_courses = data["course_data"].apply(lambda x: x.split())
-w2vec = Word2Vec(sentences=tokenized_courses, vector_size=100, window=5, min_count=1, workers=4)
+            texts = course_data(chunk)
+            # One line per course, tokens exactly as str.split() sees them
+            corpus.writelines(" ".join(tokens) + "\n" for tokens in texts.str.split())
+            try:
+                counts = counter.fit_transform(texts)
+            except ValueError:  # no terms left in this chunk after stop words
+                counts = None
+            if counts is not None:
+                terms = counter.get_feature_names_out()
+                term_counts = term_counts.add(pd.Series(np.asarray(counts.sum(axis=0)).ravel(), index=terms),
+                                              fill_value=0)
+                doc_counts = doc_counts.add(pd.Series(np.bincount(counts.indices, minlength=len(terms)),
+                                                      index=terms), fill_value=0)
+            frames.append(chunk)
 
-# Embedding Function
-def embedding_(text):
-    words = text.split()
-    vecs = [w2vec.wv[word] for word in words if word in w2vec.wv]
-    return np.mean(vecs, axis=0) if vecs else np.zeros(100)
+    # Chunks saw different subject/level values; give them one set of categories
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            categories = union_categoricals([frame[column] for frame in frames]).categories
+            for frame in frames:
+                frame[column] = frame[column].cat.set_categories(categories)
+    catalog = pd.concat(frames, ignore_index=True)
+    del frames
 
-# Apply Embeddings
-data["embedding"] = data["course_data"].apply(embedding_)
-word2vec_matrix = np.vstack(data["embedding"].values)
+    vectorizer = _fit_tfidf(term_counts, doc_counts, len(catalog), max_features)
+    w2vec = Word2Vec(sentences=LineSentence(corpus_path), vector_size=vector_size, window=5,
+                     min_count=1, workers=4, seed=seed)
 
-# Combine Features
-combined_f = np.hstack([tf_idf.toarray(), word2vec_matrix])
+    w2v_f = np.lib.format.open_memmap(os.path.join(work_dir, "w2v_features.npy"), mode="w+",
+                                      dtype=np.float64, shape=(len(catalog), vector_size))
+    tfidf_parts = []
+    with open(corpus_path, encoding="utf-8") as corpus:
+        start = 0
+        while True:
+            lines = list(itertools.islice(corpus, chunk_size))
+            if not lines:
+                break
+            tfidf_chunk, w2v_chunk = normalize_features(vectorizer.transform(lines), embedding_(lines, w2vec.wv))
+            w2v_f[start:start + len(lines)] = w2v_chunk
+            tfidf_parts.append(tfidf_chunk)
+            start += len(lines)
+    w2v_f.flush()
+    return catalog, vectorizer, w2vec.wv, sparse.vstack(tfidf_parts, format="csr"), w2v_f
@@ -0,0 +1,159 @@
+import argparse
+import json
+import time
+import numpy as np
+from scipy import sparse
+
+# Reduced-precision feature storage.
+#
+# An index can store its features as float64 (the default), float32, float16
+# or int8 with one float32 scale per row. The dense Word2Vec half is almost all
+# of the feature bytes and is the part that gets quantized; the TF-IDF values
+# go to float32 whenever the precision is below float64 (SciPy has no float16
+# or int8 sparse kernels, it would upcast them on every query). Queries are
+# scored in float32 for every precision other than float64.
+#
+# float16 and int8 rows are dequantized to float32 in bounded blocks while
+# scoring, so memory stays at the stored size plus one block.
+
+PRECISIONS = ("float64", "float32", "float16", "int8")
+
+# Rows converted at once while quantizing or scoring
+DEQUANTIZE_BLOCK_ROWS = 1 << 16
+
+
+class QuantizedMatrix:
+    """Read-only dense matrix stored as float16, or int8 with a scale per row.
+
+    Supports what the index needs from its dense features: `shape`, row
+    indexing (returns float32 rows) and `@` against a vector or a matrix.
+    """
+
+    def __init__(self, values, scales=None):
+        self.values = values
+        self.scales = scales
+        self.precision = np.dtype(values.dtype).name
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, rows):
+        block = self.values[rows].astype(np.float32)
+        if self.scales is not None:
+            block *= self.scales[rows, None]
+        return block
+
+    def __matmul__(self, other):
+        other = np.asarray(other, dtype=np.float32)
+        out = np.empty((len(self.values),) + other.shape[1:], dtype=np.float32)
+        for start in range(0, len(self.values), DEQUANTIZE_BLOCK_ROWS):
+            stop = start + DEQUANTIZE_BLOCK_ROWS
+            # Scale after the product: one multiply per row instead of one per value
+            product = self.values[start:stop].astype(np.float32) @ other
+            if self.scales is not None:
+                product *= self.scales[start:stop].reshape((-1,) + (1,) * (product.ndim - 1))
+            out[start:stop] = product
+        return out
+
+
+def quantize(matrix, precision):
+    """Dense features in `precision`, as an ndarray or a QuantizedMatrix."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}; expected one of {', '.join(PRECISIONS)}")
+    if precision in ("float64", "float32"):
+        return np.asarray(matrix).astype(precision, copy=False)
+
+    # Converted in row blocks so a memory-mapped input is never copied whole
+    values = np.empty(matrix.shape, dtype=np.float16 if precision == "float16" else np.int8)
+    scales = np.empty(len(values), dtype=np.float32) if precision == "int8" else None
+    for start in range(0, len(values), DEQUANTIZE_BLOCK_ROWS):
+        stop = start + DEQUANTIZE_BLOCK_ROWS
+        block = np.asarray(matrix[start:stop])
+        if scales is None:
+            values[start:stop] = block
+            continue
+        # Symmetric per-row int8: the largest magnitude in each row maps to 127
+        block_scales = np.abs(block).max(axis=1) / 127.0
+        block_scales[block_scales == 0] = 1.0
+        values[start:stop] = np.rint(block / block_scales[:, None])
+        scales[start:stop] = block_scales
+    return QuantizedMatrix(values, scales)
+
+
+def quantize_sparse(matrix, precision):
+    """TF-IDF features for `precision`: float64, or float32 for every reduced precision."""
+    return sparse.csr_matrix(matrix, dtype=np.float64 if precision == "float64" else np.float32)
+
+
+def features_nbytes(tfidf_f, w2v_f):
+    return int(tfidf_f.data.nbytes + tfidf_f.indices.nbytes + tfidf_f.indptr.nbytes + w2v_f.nbytes)
+
+
+def parity(index, titles, k=5, precisions=PRECISIONS):
+    """Top-k agreement and latency of each precision against the float64 index."""
+    from .index import CourseIndex
+
+    def timed_recommend(candidate):
+        latencies, results = [], []
+        for title in titles:
+            start = time.perf_counter()
+            results.append(candidate.recommend(title, k)[0].tolist())
+            latencies.append((time.perf_counter() - start) * 1000)
+        return results, latencies
+
+    reference, _ = timed_recommend(index)
+    report = []
+    for precision in precisions:
+        tfidf_f = quantize_sparse(index.tfidf_f, precision)
+        w2v_f = quantize(index.w2v_f, precision)
+        candidate = CourseIndex(index.version, index.catalog, index.vectorizer, index.wv, tfidf_f, w2v_f)
+        found, latencies = timed_recommend(candidate)
+        report.append({
+            "precision": precision,
+            "feature_mb": round(features_nbytes(tfidf_f, w2v_f) / 2**20, 2),
+            "overlap_at_k": round(float(np.mean([len(set(a) & set(b)) / max(1, len(b))
+                                                 for a, b in zip(found, reference)])), 4),
+            "same_order": round(float(np.mean([a == b for a, b in zip(found, reference)])), 4),
+            "same_top1": round(float(np.mean([a[:1] == b[:1] for a, b in zip(found, reference)])), 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        })
+    return report
+
+
+def main():
+    from .index import INDEX_DIR, load_index
+
+    parser = argparse.ArgumentParser(description="Top-k parity of reduced-precision features against float64")
+    parser.add_argument("--root", default=INDEX_DIR, help="index root directory")
+    parser.add_argument("--version", help="float64 index version (default: LATEST)")
+    parser.add_argument("--precision", nargs="+", default=list(PRECISIONS), choices=PRECISIONS)
+    parser.add_argument("--queries", type=int, default=500, help="catalog titles sampled as queries")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    index = load_index(args.root, args.version, search="exact")
+    if index.precision != "float64":
+        raise SystemExit(f"Index {index.version} is stored as {index.precision}; "
+                         "parity is measured against a float64 build")
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(index), min(args.queries, len(index)), replace=False)
+    titles = index.catalog["course_title"].astype(str).iloc[sample].tolist()
+    for row in parity(index, titles, args.k, args.precision):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,58 @@
-from flask import Blueprint, render_template, request, jsonify
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import normalize
-from .preprocess import data, vectorizer, embedding_, combined_f
+import os
+import time
+from flask import Blueprint, Response, abort, g, render_template, request, jsonify
+from . import metrics
+from .ann import IVFSearcher
+from .index import IndexHolder, load_index
+from .cache import ResultCache, cache_key
+from .filters import parse_filters
+from .quantize import features_nbytes
+
+# Memory-mapped index built offline by build_index.py, loaded on first use
+# (or warmed up by create_app). It is never mutated: catalog changes publish
+# a new index through the holder, and per-request scores live in local arrays.
+holder = IndexHolder(loader=load_index)
+results_cache = ResultCache()
+
+DEFAULT_K = 5
+MAX_K = int(os.getenv("RECOMMEND_MAX_K", "50"))
+MAX_BATCH = int(os.getenv("RECOMMEND_MAX_BATCH", "1000"))
+DEFAULT_SUGGEST = 8
+MAX_SUGGEST = 20
 
 main = Blueprint('main', __name__)
 
+@main.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@main.after_request
+def record_request(response):
+    if metrics.ENABLED and "request_start" in g:
+        metrics.observe_request(request.endpoint or "unknown", response.status_code,
+                                time.perf_counter() - g.request_start)
+    return response
+
+def parse_k(input_data):
+    """Number of recommendations requested, or None if it is not in 1..MAX_K."""
+    try:
+        k = int(input_data.get("k", DEFAULT_K))
+    except (TypeError, ValueError):
+        return None
+    return k if 1 <= k <= MAX_K else None
+
+def format_recommendations(index, rows):
+    recommended_courses = index.rows_frame(rows)
+    return [{
+        "course_title": row["course_title"],
+        "subject": row["subject"],
+        "published_date": str(row.get("published_timestamp", "")),  # Handle missing timestamps
+        "price": row["price"],
+        "subscribers": int(row["num_subscribers"]),
+        "reviews": int(row["num_reviews"]),
+        "popularity_rating": round(row["popularity_rating"], 2)
+    } for row in recommended_courses.to_dict("records")]
+
 @main.route("/")
 def home():
     return render_template("index.html")
@@ -23,45 +70,149 @@ def recommend():
         if not input_title:
             return jsonify({"error": "Course title is required"}), 400
 
-        # Compute TF-IDF & Word2Vec embeddings
-        tfidf_title = vectorizer.transform([input_title]).toarray()
-        w2vec_title = embedding_(input_title).reshape(1, -1)
-
-        # Normalize features
-        nor_tfidf_title = normalize(tfidf_title)
-        nor_w2vec_title = normalize(w2vec_title)
-
-        # Combine features
-        combined_vec = np.concatenate([nor_tfidf_title, nor_w2vec_title], axis=1)
-
-        # Compute similarity
-        similarity = cosine_similarity(combined_vec, combined_f)
-        data["similarity"] = similarity.flatten()
-
-        # Popularity metric
-        data["popularity_rating"] = data.apply(
-            lambda row: min(5, (0.6 * (row["num_subscribers"] / 10000)) + (0.4 * (row["num_reviews"] / 500))),
-            axis=1
-        )
-
-        # Get top 5 recommendations
-        recommended_courses = data.sort_values(by=["similarity", "popularity_rating"], ascending=[False, False]).head(5)
-
-        # Format recommendations
-        recommendations = []
-        for _, row in recommended_courses.iterrows():
-            recommendations.append({
-                "course_title": row["course_title"],
-                "subject": row["subject"],
-                "published_date": str(row.get("published_timestamp", "")),  # Handle missing timestamps
-                "price": row["price"],
-                "subscribers": int(row["num_subscribers"]),
-                "reviews": int(row["num_reviews"]),
-                "popularity_rating": round(row["popularity_rating"], 2)
-            })
-
-        return jsonify({"recommendations": recommendations})
+        k = parse_k(input_data)
+        if k is None:
+            return jsonify({"error": f"k must be an integer between 1 and {MAX_K}"}), 400
+        try:
+            filters = parse_filters(input_data.get("filters"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        index = holder.get()
+        key = cache_key(input_title, k, filters)
+        recommendations = results_cache.get(index.version, key)
+        if recommendations is None:
+            # Top-k by similarity (cosine, features are pre-normalized) among the rows
+            # passing the filters, ties broken by popularity
+            rows, _scores = index.recommend(input_title, k, filters)
+            with metrics.timer("format"):
+                recommendations = format_recommendations(index, rows)
+            results_cache.put(index.version, key, recommendations)
+
+        with metrics.timer("serialize"):
+            return jsonify({"recommendations": recommendations})
 
     except Exception as e:
         print("Error in recommendation:", str(e))  # Print error in terminal
         return jsonify({"error": str(e)}), 500
+
+@main.route("/recommend/batch", methods=["POST"])
+def recommend_batch():
+    try:
+        input_data = request.json
+        titles = input_data.get("course_titles")
+
+        if not isinstance(titles, list) or not titles:
+            return jsonify({"error": "course_titles must be a non-empty list"}), 400
+        if len(titles) > MAX_BATCH:
+            return jsonify({"error": f"At most {MAX_BATCH} titles per batch"}), 400
+        titles = [str(title or "").strip() for title in titles]
+        if not all(titles):
+            return jsonify({"error": "Course titles must not be empty"}), 400
+
+        k = parse_k(input_data)
+        if k is None:
+            return jsonify({"error": f"k must be an integer between 1 and {MAX_K}"}), 400
+        try:
+            filters = parse_filters(input_data.get("filters"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        index = holder.get()
+        keys = [cache_key(title, k, filters) for title in titles]
+        cached = [results_cache.get(index.version, key) for key in keys]
+        missing = [i for i, recommendations in enumerate(cached) if recommendations is None]
+
+        # Uncached titles are vectorized together and scored with one matrix multiply per block
+        if missing:
+            batch = index.recommend_batch([titles[i] for i in missing], k, filters)
+            with metrics.timer("format"):
+                for i, (rows, _scores) in zip(missing, batch):
+                    cached[i] = format_recommendations(index, rows)
+                    results_cache.put(index.version, keys[i], cached[i])
+
+        results = [{"course_title": title, "recommendations": recommendations}
+                   for title, recommendations in zip(titles, cached)]
+
+        with metrics.timer("serialize"):
+            return jsonify({"results": results})
+
+    except Exception as e:
+        print("Error in batch recommendation:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+@main.route("/suggest")
+def suggest():
+    """Typeahead: popular course titles matching the words typed so far (?q=...&limit=...)."""
+    query = request.args.get("q", "")
+    try:
+        limit = int(request.args.get("limit", DEFAULT_SUGGEST))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_SUGGEST:
+        return jsonify({"error": f"limit must be an integer between 1 and {MAX_SUGGEST}"}), 400
+    with metrics.timer("suggest"):
+        suggestions = holder.get().suggest(query[:200], limit)
+    return jsonify({"query": query, "suggestions": [title for _row, title in suggestions]})
+
+@main.route("/index/version")
+def index_version():
+    index = holder.get()
+    return jsonify({
+        "version": index.version,
+        "base_version": index.base_version,
+        "changes": index.changes,
+        "courses": index.live_rows,
+        "precision": index.precision,
+        "search": "ivf" if isinstance(index.searcher, IVFSearcher) else "exact",
+    })
+
+@main.route("/cache/stats")
+def cache_stats():
+    return jsonify(results_cache.stats())
+
+@main.route("/healthz")
+def healthz():
+    """Liveness: the process is up and serving HTTP, whether or not the index is loaded."""
+    return jsonify({"status": "ok"})
+
+@main.route("/readyz")
+def readyz():
+    """Readiness: 200 once the index is loaded, 503 while it loads or if loading failed.
+
+    A probe starts the load if nothing has (COURSE_INDEX_WARMUP=0) and retries a
+    failed one, so a server taking no traffic until it is ready still gets there.
+    """
+    if holder.ready:
+        return jsonify({"status": "ready", "version": holder.get().version})
+    holder.warmup()
+    if holder.error is not None:
+        return jsonify({"status": "error", "error": str(holder.error)}), 503
+    return jsonify({"status": "loading"}), 503
+
+@main.route("/metrics")
+def metrics_endpoint():
+    if not metrics.ENABLED:
+        abort(404)
+    ready = metrics.gauge("recommend_index_ready", "1 once the index is loaded.", {(): int(holder.ready)})
+    if not holder.ready:
+        return Response(metrics.render(ready), content_type=metrics.CONTENT_TYPE)
+    index = holder.get()
+    cache = results_cache.stats()
+    text = metrics.render(
+        ready,
+        metrics.gauge("recommend_index_info", "Index version being served.",
+                      {(index.version, index.precision): 1}, ("version", "precision")),
+        metrics.gauge("recommend_index_rows", "Index rows by kind.", {
+            ("base",): index.base_rows,
+            ("delta",): len(index.delta_catalog),
+            ("deleted",): len(index.deleted),
+            ("live",): index.live_rows,
+        }, ("kind",)),
+        metrics.gauge("recommend_index_feature_bytes", "Bytes of base feature arrays (memory-mapped).",
+                      {(): features_nbytes(index.tfidf_f, index.w2v_f)}),
+        metrics.gauge("recommend_cache_entries", "Entries in the result cache.", {(): cache["size"]}),
+        metrics.gauge("recommend_cache_lookups_total", "Result cache lookups by outcome.",
+                      {("hit",): cache["hits"], ("miss",): cache["misses"]}, ("outcome",), "counter"),
+    )
+    return Response(text, content_type=metrics.CONTENT_TYPE)
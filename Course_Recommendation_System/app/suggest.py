@@ -0,0 +1,75 @@
+import bisect
+import re
+import numpy as np
+import pandas as pd
+
+# Typeahead over course titles.
+#
+# Titles are lowercased and split into word tokens. The distinct tokens are
+# kept sorted, so the tokens starting with a prefix are one contiguous range
+# found by binary search; their rows are stored token by token in one array
+# (CSR-style offsets), each token's rows sorted by popularity. A prefix is
+# therefore one slice of that array, and its most popular rows are at the
+# head of each token's run.
+
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN.findall(str(text).lower())
+
+
+def title_matches(title, prefixes):
+    """Whether every prefix starts some word of `title`."""
+    words = tokenize(title)
+    return all(any(word.startswith(prefix) for word in words) for prefix in prefixes)
+
+
+class PrefixIndex:
+    def __init__(self, titles, popularity):
+        tokens = pd.Series(list(titles), dtype=object).str.lower().str.findall(TOKEN.pattern).explode().dropna()
+        rows = tokens.index.to_numpy(dtype=np.int64)
+        codes, vocabulary = pd.factorize(tokens.to_numpy(dtype=object), sort=True)
+        # One entry per (token, row), a row counted once per token
+        pairs = np.unique(np.stack([codes.astype(np.int64), rows]), axis=1)
+        codes, rows = pairs[0], pairs[1]
+        order = np.lexsort((-np.asarray(popularity)[rows], codes))
+        self.tokens = list(vocabulary)
+        self.rows = rows[order].astype(np.int32)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(self.tokens)))])
+        self.popularity = popularity
+        self.titles = np.asarray(list(titles), dtype=object)
+
+    def token_range(self, prefix):
+        """[first, last) token ids starting with `prefix`."""
+        return (bisect.bisect_left(self.tokens, prefix),
+                bisect.bisect_left(self.tokens, prefix + "\U0010ffff"))
+
+    def search(self, prefixes, count):
+        """Up to `count` rows whose titles have a word starting with each prefix, most popular first."""
+        ranges = sorted((self.token_range(prefix) for prefix in prefixes),
+                        key=lambda r: self.offsets[r[1]] - self.offsets[r[0]])
+        first, last = ranges[0]
+        if first == last:
+            return np.zeros(0, dtype=np.int64)
+
+        if len(ranges) == 1:
+            # Only the head of each token's run can make the top `count`
+            starts, stops = self.offsets[first:last], self.offsets[first + 1:last + 1]
+            positions = starts[:, None] + np.arange(count)
+            candidates = self.rows[positions[positions < stops[:, None]]]
+        else:
+            candidates = self.rows[self.offsets[first]:self.offsets[last]]
+            for first, last in ranges[1:]:
+                mark = np.zeros(len(self.titles), dtype=bool)
+                mark[self.rows[self.offsets[first]:self.offsets[last]]] = True
+                candidates = candidates[mark[candidates]]
+        candidates = np.unique(candidates)
+
+        if len(candidates) > count:
+            # Keep everything tied with the count-th most popular, then order exactly
+            popularity = self.popularity[candidates]
+            kth = np.partition(popularity, len(candidates) - count)[len(candidates) - count]
+            candidates = candidates[popularity >= kth]
+        order = np.lexsort((candidates, -self.popularity[candidates]))
+        return candidates[order][:count].astype(np.int64)
@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+# Recommender benchmark on synthetic catalogs.
+#
+# For each catalog size: generate a udemy_courses.csv-shaped catalog, build
+# the index with build_index.py, then in a fresh process measure startup
+# (import + create_app), single-query and batch-query latency through the
+# Flask test client and peak RSS. Results go to a JSON report; pass
+# --baseline with an earlier report to flag regressions.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SUBJECTS = ["Business Finance", "Graphic Design", "Musical Instruments", "Web Development"]
+LEVELS = ["All Levels", "Beginner Level", "Intermediate Level", "Expert Level"]
+WORDS = (
+    "python java javascript react angular django flask sql excel finance accounting trading stock "
+    "forex investing marketing seo photoshop illustrator design logo drawing guitar piano drums "
+    "violin singing music theory web development html css bootstrap php wordpress data science "
+    "machine learning deep analysis statistics beginners complete guide masterclass course learn "
+    "advanced introduction fundamentals practical bootcamp projects professional essentials mastery"
+).split()
+
+
+def synthetic_catalog(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    # Zipf-like word frequencies, like real course titles
+    weights = 1.0 / np.arange(1, len(WORDS) + 1)
+    weights /= weights.sum()
+    lengths = rng.integers(3, 9, rows)
+    words = rng.choice(WORDS, size=(rows, 8), p=weights)
+    titles = [" ".join(w[:n]).title() for w, n in zip(words, lengths)]
+    price = rng.choice([0, 20, 50, 95, 150, 200], rows)
+    return pd.DataFrame({
+        "course_id": np.arange(1, rows + 1),
+        "course_title": titles,
+        "url": [f"https://www.udemy.com/course-{i}/" for i in range(rows)],
+        "is_paid": price > 0,
+        "price": price,
+        "num_subscribers": rng.zipf(1.5, rows).clip(max=300000),
+        "num_reviews": rng.zipf(1.8, rows).clip(max=30000),
+        "num_lectures": rng.integers(1, 300, rows),
+        "level": rng.choice(LEVELS, rows),
+        "content_duration": rng.uniform(0.5, 40, rows).round(1),
+        "published_timestamp": (pd.Timestamp("2011-01-01")
+                                + pd.to_timedelta(rng.integers(0, 2500, rows), unit="D")).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "subject": rng.choice(SUBJECTS, rows),
+    })
+
+
+def percentiles(latencies):
+    return {"p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            "mean_ms": round(float(np.mean(latencies)), 3)}
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(queries, batches, k):
+    """Runs in a fresh process with COURSE_INDEX_DIR pointing at the built index."""
+    start = time.perf_counter()
+    from app import create_app
+    from app.routes import holder
+    client = create_app().test_client()
+    holder.load()  # startup lasts until the index is ready, not just until the app exists
+    startup = time.perf_counter() - start
+
+    single = []
+    for title in queries:
+        start = time.perf_counter()
+        resp = client.post("/recommend", json={"course_title": title, "k": k})
+        single.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 200, resp.get_json()
+
+    batch = []
+    for titles in batches:
+        start = time.perf_counter()
+        resp = client.post("/recommend/batch", json={"course_titles": titles, "k": k})
+        batch.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 200, resp.get_json()
+
+    return {
+        "startup_s": round(startup, 3),
+        "single_query": percentiles(single),
+        "batch_query": {**percentiles(batch), "batch_size": len(batches[0]) if batches else 0,
+                        "per_title_ms": round(float(np.mean(batch)) / max(1, len(batches[0])), 3) if batches else None},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_size(rows, args, work_dir):
+    csv_path = os.path.join(work_dir, f"catalog_{rows}.csv")
+    root = os.path.join(work_dir, f"index_{rows}")
+    catalog = synthetic_catalog(rows)
+    catalog.to_csv(csv_path, index=False)
+
+    build = [sys.executable, os.path.join(HERE, "build_index.py"), "--csv", csv_path, "--out", root]
+    if args.ann_lists:
+        build += ["--ann-lists", str(args.ann_lists)]
+    build += ["--precision", args.precision]
+    start = time.perf_counter()
+    subprocess.run(build, cwd=HERE, check=True, stdout=subprocess.DEVNULL)
+    build_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    titles = catalog["course_title"].to_numpy()
+    queries = rng.choice(titles, args.queries).tolist()
+    batches = [rng.choice(titles, args.batch_size).tolist() for _ in range(args.batches)]
+
+    env = {**os.environ, "COURSE_INDEX_DIR": root,
+           "RECOMMEND_CACHE_SIZE": "0",  # measure the index, not the result cache
+           "RECOMMEND_COMPACTION_INTERVAL": "0",
+           "RECOMMEND_MAX_BATCH": str(max(args.batch_size, 1))}
+    payload = json.dumps({"queries": queries, "batches": batches, "k": args.k})
+    child = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure"], cwd=HERE, env=env,
+                           input=payload, capture_output=True, text=True, check=True)
+    return {"rows": rows, "build_s": round(build_s, 3), **json.loads(child.stdout.strip().splitlines()[-1])}
+
+
+def compare(report, baseline, tolerance):
+    """Metrics that got worse than `tolerance` (e.g. 0.2 = 20%) relative to the baseline."""
+    previous = {entry["rows"]: entry for entry in baseline["results"]}
+    regressions = []
+    for entry in report["results"]:
+        old = previous.get(entry["rows"])
+        if old is None:
+            continue
+        metrics = [("startup_s",), ("peak_rss_mb",), ("single_query", "p50_ms"), ("single_query", "p99_ms"),
+                   ("batch_query", "p50_ms"), ("batch_query", "p99_ms")]
+        for path in metrics:
+            new_value, old_value = entry, old
+            for key in path:
+                new_value, old_value = new_value.get(key), old_value.get(key)
+            if old_value and new_value is not None and new_value > old_value * (1 + tolerance):
+                regressions.append({"rows": entry["rows"], "metric": ".".join(path),
+                                    "baseline": old_value, "current": new_value})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recommender on synthetic catalogs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200, help="single queries per size")
+    parser.add_argument("--batches", type=int, default=10, help="batch requests per size")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--ann-lists", type=int, default=0, help="build an IVF index with this many lists")
+    parser.add_argument("--precision", default="float64", help="feature storage precision of the built indexes")
+    parser.add_argument("--work-dir", help="keep catalogs and indexes here (default: a temporary directory)")
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        spec = json.loads(sys.stdin.read())
+        print(json.dumps(measure(spec["queries"], spec["batches"], spec["k"])))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.work_dir or tmp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        results = []
+        for rows in args.sizes:
+            result = run_size(rows, args, work_dir)
+            print(json.dumps(result))
+            results.append(result)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "settings": {"queries": args.queries, "batches": args.batches, "batch_size": args.batch_size,
+                     "k": args.k, "ann_lists": args.ann_lists, "precision": args.precision},
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if report.get("regressions"):
+        for regression in report["regressions"]:
+            print("Regression:", json.dumps(regression))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
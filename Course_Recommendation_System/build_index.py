@@ -0,0 +1,42 @@
+import argparse
+import os
+import tempfile
+from app.preprocess import load_data, build_features, stream_features
+from app.index import INDEX_DIR, save_index
+from app.ann import build_ivf
+from app.quantize import PRECISIONS
+
+# Offline build step: fit the models once and write a versioned index that
+# `create_app()` memory-maps at startup.
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the course recommendation index")
+    parser.add_argument("--csv", default="data/udemy_courses.csv", help="course catalog CSV")
+    parser.add_argument("--out", default=INDEX_DIR, help="index root directory")
+    parser.add_argument("--max-features", type=int, default=2000)
+    parser.add_argument("--vector-size", type=int, default=100)
+    parser.add_argument("--ann-lists", type=int, default=0,
+                        help="also build an IVF index with this many lists (0 = exact search only)")
+    parser.add_argument("--precision", default="float64", choices=PRECISIONS,
+                        help="storage type of the features (int8 uses a scale per row)")
+    parser.add_argument("--chunk-size", type=int, default=0,
+                        help="stream the CSV in chunks of this many rows (0 = load it whole)")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    # Streaming builds keep their corpus and feature files next to the index until it is saved
+    with tempfile.TemporaryDirectory(dir=args.out, prefix=".build-") as work_dir:
+        if args.chunk_size:
+            data, vectorizer, wv, tfidf_f, w2v_f = stream_features(
+                args.csv, work_dir, args.chunk_size, args.max_features, args.vector_size)
+        else:
+            data = load_data(args.csv)
+            vectorizer, wv, tfidf_f, w2v_f = build_features(data, args.max_features, args.vector_size)
+        ivf = build_ivf(tfidf_f, w2v_f, args.ann_lists) if args.ann_lists else None
+        version = save_index(args.out, data, vectorizer, wv, tfidf_f, w2v_f, source=args.csv, ivf=ivf,
+                             precision=args.precision, max_features=args.max_features)
+    print(f"Built index {version} ({len(data)} courses, {args.precision}) in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Concurrency load test for /recommend.
+#
+# Records the expected response of each query serially, then fires the same
+# queries from many threads at once and checks that every response matches
+# its own query. Runs in-process through Flask test clients by default, or
+# against a running server with --url.
+#
+# The baseline pass would fill the result cache and turn every parallel
+# request into a cache hit, so the in-process app runs with the cache off. A
+# server tested with --url must be started with RECOMMEND_CACHE_SIZE=0 too.
+
+def make_client(url):
+    if url:
+        def post(body):
+            req = urllib.request.Request(url.rstrip("/") + "/recommend", data=json.dumps(body).encode(),
+                                         headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(req) as resp:
+                return resp.status, json.loads(resp.read())
+        return lambda: post
+
+    # Exercise concurrent scoring, not the result cache; read when `app` is imported
+    os.environ["RECOMMEND_CACHE_SIZE"] = "0"
+    from app import create_app
+    app = create_app()
+    local = threading.local()
+
+    def post(body):
+        # One test client per thread, like one connection per client
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        resp = local.client.post("/recommend", json=body)
+        return resp.status_code, resp.get_json()
+    return lambda: post
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fire parallel /recommend requests and verify each response")
+    parser.add_argument("--url", help="base URL of a running server started with RECOMMEND_CACHE_SIZE=0 "
+                                      "(default: in-process test client)")
+    parser.add_argument("--queries", nargs="+", default=[
+        "python for beginners", "web development bootcamp", "guitar lessons", "financial accounting",
+        "photoshop design", "javascript react", "piano", "stock trading", "data science", "excel"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    post = make_client(args.url)()
+    bodies = [{"course_title": query, "k": args.k} for query in args.queries]
+    expected = {}
+    for body in bodies:
+        status, payload = post(body)
+        if status != 200:
+            raise SystemExit(f"Baseline request for {body['course_title']!r} failed: {status} {payload}")
+        expected[body["course_title"]] = payload
+
+    def fire(body):
+        start = time.perf_counter()
+        status, payload = post(body)
+        latency = (time.perf_counter() - start) * 1000
+        return body["course_title"], status == 200 and payload == expected[body["course_title"]], latency
+
+    schedule = [random.choice(bodies) for _ in range(args.requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(fire, schedule))
+    elapsed = time.perf_counter() - start
+
+    mismatches = [title for title, ok, _ in results if not ok]
+    latencies = sorted(latency for _, _, latency in results)
+    print(json.dumps({
+        "requests": len(results),
+        "threads": args.threads,
+        "mismatches": len(mismatches),
+        "mismatched_queries": sorted(set(mismatches)),
+        "throughput_rps": round(len(results) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))], 2),
+    }, indent=2))
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# Pre-fork server: load the index once, then fork worker processes.
+#
+# The features, word vectors and IVF lists are memory-mapped from the index
+# files, so every worker reads the same page-cached copy. Everything else
+# (catalog rows, filter indexes, popularity) is built once in the parent
+# before forking and shared copy-on-write; gc.freeze() keeps the collector
+# from touching those objects and un-sharing their pages. Each worker is a
+# threaded WSGI server accepting on the socket the parent bound.
+#
+# Workers are separate processes, so admin catalog changes (which live in a
+# worker's memory) are disabled; new builds reach every worker through the
+# LATEST watcher instead.
+
+
+def serve_worker(app, sock, watch_interval):
+    from werkzeug.serving import make_server
+    from app.admin import start_watcher
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles Ctrl-C
+    start_watcher(watch_interval)
+    server = make_server(*sock.getsockname()[:2], app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the recommender with pre-forked worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--watch-interval", type=float,
+                        default=float(os.getenv("COURSE_INDEX_WATCH_INTERVAL", "5")),
+                        help="seconds between checks for a new index build (0 disables)")
+    args = parser.parse_args()
+    if not hasattr(os, "fork"):
+        raise SystemExit("serve.py needs os.fork; use `python run.py` on this platform")
+
+    # Read by the admin blueprint, which disables per-process catalog changes
+    os.environ["RECOMMEND_WORKERS"] = str(args.workers)
+    os.environ["RECOMMEND_COMPACTION_INTERVAL"] = "0"
+
+    from app import create_app
+    from app.routes import holder
+    app = create_app(background=False)
+    holder.load()  # before forking, so every worker shares this copy
+    sock = socket.create_server((args.host, args.port), backlog=128)
+    gc.freeze()
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers")
+
+    workers = {}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                serve_worker(app, sock, args.watch_interval)
+            finally:
+                os._exit(0)
+        workers[pid] = time.monotonic()
+
+    def stop(*_):
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(args.workers):
+        spawn()
+
+    # Replace workers that die; a worker crashing right after start is not retried in a loop
+    while True:
+        pid, status = os.wait()
+        started = workers.pop(pid, None)
+        if started is None:
+            continue
+        print(f"Worker {pid} exited with status {status}")
+        if time.monotonic() - started < 1:
+            stop()
+        spawn()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,23 @@
 import warnings
 warnings.filterwarnings('ignore')
 
-from flask import Blueprint,render_template,flash,request,session,jsonify
+from flask import Blueprint,render_template,flash,request,session,jsonify,url_for
 from werkzeug.utils import secure_filename
 from .auth import login_check 
-from .utils import process_doc, get_user_documents
+from .utils import process_doc, get_user_documents, DOCUMENTS_PER_PAGE
+from .jobs import ingest_jobs
+from .embed_cache import embedding_cache
 import tempfile
+import shutil
 import os
 import json
 import logging
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from datetime import datetime
-from .utils import get_context,process_schedule
+from .utils import get_context,process_schedule,scoring_latency,SCORING_MODE,pre_retrieval_latency,PRE_RETRIEVAL_MODE
+from .query_cache import query_cache
+from .context_cache import context_cache
 
 # Get application logger
 app_logger = logging.getLogger('app')
@@ -34,8 +39,11 @@ chats={}
 def my_documents():
     """Display all documents uploaded by the current user."""
     username = session.get('username', '')
-    documents = get_user_documents(username)
-    return render_template('my_documents.html', documents=documents, username=username)
+    page = max(1, request.args.get('page', 1, type=int))
+    documents, total, type_counts = get_user_documents(username, page, DOCUMENTS_PER_PAGE)
+    pages = max(1, -(-total // DOCUMENTS_PER_PAGE))
+    return render_template('my_documents.html', documents=documents, username=username,
+                           total=total, page=page, pages=pages, type_counts=type_counts)
 
 
 @doc_bp.route("/Upload",methods=['POST'])
@@ -59,28 +67,53 @@ def upload_docs():
     else:
         return jsonify({"error":"Unsupported file type"}),400
         
+    username = session.get('username', 'unknown')
+    tmp_dir=None
+    job=None
     try:
-        username = session.get('username', 'unknown')
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            save_path=os.path.join(tmp_dir,f_name)
-            request.files['file'].save(save_path)
-            
-            res,msg=process_doc(save_path, doc_type, username)
-        
-        if not res:
-            app_logger.warning(f'Document processing failed for {username}: {msg}')
-            flash("Couldn't process document","error")
-            raise Exception(msg)
+        # Kept until the background job has ingested it
+        tmp_dir=tempfile.mkdtemp(prefix="taskify-upload-")
+        save_path=os.path.join(tmp_dir,f_name)
+        request.files['file'].save(save_path)
+        job=ingest_jobs.submit(username, f_name, ingest_upload, tmp_dir, save_path, doc_type, username)
         
-        app_logger.info(f'Document uploaded successfully by {username}: {f_name}')
-        flash("Successfully processed the document!", "success")
-        return jsonify({"message":"Document processed"}),201
+        app_logger.info(f'Document queued for {username}: {f_name} (job {job.id})')
+        return jsonify({"message":"Document queued","job_id":job.id,
+                        "status_url":url_for("document.upload_status",job_id=job.id)}),202
         
     except Exception as e:
+        # Once a job exists it owns the directory and removes it when done
+        if tmp_dir and job is None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
         app_logger.error(f'Error uploading document for {username}: {str(e)}')
         flash("Error while uploading document")
         return jsonify({"error":"Upload failed"}),500
 
+
+def ingest_upload(tmp_dir, save_path, doc_type, username, progress=None):
+    """Job body: process the saved upload, then remove it."""
+    try:
+        return process_doc(save_path, doc_type, username, progress=progress)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+@doc_bp.route("/Upload/status/<job_id>")
+@login_check
+def upload_status(job_id):
+    job=ingest_jobs.get(job_id)
+    if job is None or job.username!=session.get('username', 'unknown'):
+        return jsonify({"error":"Job not found"}),404
+    return jsonify(job.to_dict())
+
+
+@doc_bp.route("/Upload/cache-stats")
+@login_check
+def upload_cache_stats():
+    """Embedding cache size and hit rate since the server started."""
+    return jsonify(embedding_cache.stats())
+
+
 @schedule_bp.route("/api/chat/save-message", methods=['POST'])
 def save_message():
     """Save a user message to chat history without generating a response."""
@@ -186,7 +219,7 @@ def generate_schedule():
     
     try:
         username = session.get('username', 'unknown')
-        context,_analysis=get_context(user_input)
+        context,_analysis=get_context(user_input, session.get('username'))
         schedule=process_schedule(user_input,context)
         # enrich for frontend list
         schedule_obj={
@@ -241,7 +274,7 @@ def generate_from_chat():
     try:
         print(f"\n=== SCHEDULE GENERATION DEBUG ===")
         print(f"User query: {latest_message}")
-        context, _analysis = get_context(latest_message)
+        context, _analysis = get_context(latest_message, session.get('username'))
         print(f"Context retrieved (length): {len(context) if context else 0}")
         print(f"Context preview: {context[:200] if context else 'EMPTY CONTEXT'}...")
         schedule = process_schedule(latest_message, context)
@@ -263,6 +296,18 @@ def generate_from_chat():
         print(f"Error while generating schedule from chat {e}")
         return jsonify({"error": "Failed to generate schedule from chat"}), 500
 
+@schedule_bp.route('/api/stats',methods=['GET'])
+def pipeline_stats():
+    """Latency of each scoring and query-analysis mode used so far, and the cache hit rates."""
+    return jsonify({
+        "scoring_mode": SCORING_MODE,
+        "scoring_latency": scoring_latency.summary(),
+        "pre_retrieval_mode": PRE_RETRIEVAL_MODE,
+        "pre_retrieval_latency": pre_retrieval_latency.summary(),
+        "query_cache": query_cache.stats(),
+        "context_cache": context_cache.stats(),
+    })
+
 @schedule_bp.route('/api/chat/history',methods=['GET'])
 def chat_history():
     session_id=session.get("username","anon")
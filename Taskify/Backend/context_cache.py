@@ -0,0 +1,80 @@
+import os
+import math
+import threading
+import time
+from array import array
+from .stats import Counters
+
+# Semantic cache for get_context.
+#
+# Each user's recent requests are kept with their embedding, the retrieved
+# context and the version of the user's document set at the time. A new
+# request whose embedding is at least SEMANTIC_CACHE_THRESHOLD cosine-similar
+# to a cached one gets that context back, unless the user has uploaded since,
+# in which case the user's older entries are dropped (counted as stale).
+# Entries live in this process's memory.
+
+THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+MAX_PER_USER = int(os.getenv("SEMANTIC_CACHE_MAX_PER_USER", "50"))
+TTL = float(os.getenv("SEMANTIC_CACHE_TTL", str(24 * 3600)))
+
+
+def unit(vector):
+    norm = math.sqrt(math.fsum(x * x for x in vector)) or 1.0
+    return array("d", (x / norm for x in vector))
+
+
+class SemanticCache:
+    def __init__(self, threshold=THRESHOLD, max_per_user=MAX_PER_USER, ttl=TTL):
+        self.threshold = threshold
+        self.max_per_user = max_per_user
+        self.ttl = ttl
+        self.counters = Counters("hits", "misses", "stale")
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.threshold <= 1
+
+    def lookup(self, username, vector, doc_version):
+        """The cached value of the most similar recent request, or None."""
+        query = unit(vector)
+        now = time.time()
+        with self._lock:
+            entries = [entry for entry in self._entries.get(username, []) if now - entry["created"] <= self.ttl]
+            best, best_similarity = None, self.threshold
+            for entry in entries:
+                similarity = sum(a * b for a, b in zip(query, entry["vector"]))
+                if similarity >= best_similarity:
+                    best, best_similarity = entry, similarity
+
+            if best is not None and best["doc_version"] != doc_version:
+                # The user's documents changed: nothing cached for them can be reused
+                entries = [entry for entry in entries if entry["doc_version"] == doc_version]
+                self.counters.inc("stale")
+                best = None
+            self._entries[username] = entries
+        if best is None:
+            self.counters.inc("misses")
+            return None
+        self.counters.inc("hits")
+        return best["value"]
+
+    def store(self, username, vector, doc_version, value):
+        with self._lock:
+            entries = self._entries.setdefault(username, [])
+            entries.append({"vector": unit(vector), "doc_version": doc_version,
+                            "value": value, "created": time.time()})
+            del entries[:-self.max_per_user]
+
+    def stats(self):
+        with self._lock:
+            entries = sum(len(user_entries) for user_entries in self._entries.values())
+        counts = self.counters.snapshot()
+        lookups = counts["hits"] + counts["misses"]
+        return {"threshold": self.threshold, "entries": entries, **counts,
+                "hit_rate": round(counts["hits"] / lookups, 4) if lookups else None}
+
+
+context_cache = SemanticCache()
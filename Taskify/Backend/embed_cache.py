@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+from array import array
+
+# Content-addressed embedding cache.
+#
+# Chunk vectors are stored in a local SQLite file keyed by sha256(model name +
+# chunk text), so a chunk that was embedded once (the same PDF uploaded again
+# under another name, or the unchanged pages of a revised roadmap) is not sent
+# to the embedding API again. The same file records the sha256 of every file a
+# user has ingested, so an identical re-upload is skipped entirely.
+
+CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    username TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    batch_id TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (username, file_hash)
+);
+"""
+
+# SQLite's default limit on bound parameters per statement is 999
+LOOKUP_BATCH = 500
+
+
+def model_name(embeddings):
+    return str(getattr(embeddings, "model", None) or type(embeddings).__name__)
+
+
+def chunk_key(model, text):
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.duplicate_files = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def embed_documents(self, embeddings, texts):
+        """Vectors for `texts`, calling embeddings.embed_documents only for the ones not cached.
+
+        Returns (vectors, cached) where `cached` is how many came from the cache.
+        """
+        model = model_name(embeddings)
+        keys = [chunk_key(model, text) for text in texts]
+        found = self._lookup(keys)
+
+        missing = [i for i, key in enumerate(keys) if key not in found]
+        if missing:
+            # Duplicate chunks within one batch are embedded once
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            fresh = dict(zip(unique, embeddings.embed_documents(unique)))
+            self._store(model, {chunk_key(model, text): vector for text, vector in fresh.items()})
+            for i in missing:
+                found[keys[i]] = fresh[texts[i]]
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return [list(found[key]) for key in keys], len(texts) - len(missing)
+
+    def _lookup(self, keys):
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique), LOOKUP_BATCH):
+                batch = unique[start:start + LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch)
+                for key, blob in rows:
+                    found[key] = array("f", blob)
+        return found
+
+    def _store(self, model, vectors):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, created) VALUES (?, ?, ?, ?)",
+                [(key, model, array("f", vector).tobytes(), now) for key, vector in vectors.items()])
+
+    def find_file(self, username, digest):
+        """The earlier upload (filename, batch_id) of an identical file by this user, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT filename, batch_id FROM files WHERE username = ? AND file_hash = ?",
+                                     (username, digest)).fetchone()
+            if row:
+                self.duplicate_files += 1
+        return row
+
+    def add_file(self, username, digest, filename, batch_id):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                               (username, digest, filename, batch_id, time.time()))
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "duplicate_files": self.duplicate_files,
+            }
+
+
+embedding_cache = EmbeddingCache()
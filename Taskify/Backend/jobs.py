@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Background ingestion jobs.
+#
+# An upload is saved to disk and handed to a small thread pool, so the request
+# returns as soon as the file is stored. Each job keeps progress counters that
+# the ingestion code advances as it goes (pages parsed, chunks embedded, chunks
+# stored) and that /Upload/status/<job_id> reports. Jobs live in this process's
+# memory; finished ones are dropped oldest first past MAX_FINISHED_JOBS.
+
+app_logger = logging.getLogger('app')
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+MAX_FINISHED_JOBS = int(os.getenv("INGEST_MAX_FINISHED_JOBS", "500"))
+
+
+class Job:
+    COUNTERS = ("pages_parsed", "chunks_total", "chunks_embedded", "chunks_cached", "chunks_stored")
+
+    def __init__(self, username, filename):
+        self.id = uuid.uuid4().hex
+        self.username = username
+        self.filename = filename
+        self.status = "queued"
+        self.error = None
+        self.message = None
+        self.created = time.time()
+        self.finished = None
+        self.counts = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def advance(self, **counts):
+        """Add to the progress counters, e.g. job.advance(chunks_stored=32)."""
+        with self._lock:
+            for name, amount in counts.items():
+                self.counts[name] += amount
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "filename": self.filename,
+                "status": self.status,
+                "error": self.error,
+                "message": self.message,
+                "created": self.created,
+                "finished": self.finished,
+                **self.counts,
+            }
+
+
+class JobQueue:
+    def __init__(self, workers=INGEST_WORKERS, max_finished=MAX_FINISHED_JOBS):
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+
+    def submit(self, username, filename, func, *args):
+        """Queue func(*args, progress=job.advance); func returns (ok, message) like process_doc."""
+        job = Job(username, filename)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        try:
+            self._pool.submit(self._run, job, func, args)
+        except Exception:
+            with self._lock:
+                del self._jobs[job.id]
+            raise
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, func, args):
+        job.status = "running"
+        try:
+            ok, msg = func(*args, progress=job.advance)
+            if not ok:
+                raise Exception(msg)
+            job.message = str(msg)
+            job.status = "done"
+            app_logger.info(f'Document processed for {job.username}: {job.filename}')
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            app_logger.error(f'Document processing failed for {job.username}: {job.filename}: {e}')
+        finally:
+            job.finished = time.time()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+ingest_jobs = JobQueue()
@@ -0,0 +1,102 @@
+import os
+import logging
+import datetime
+from pymongo import ASCENDING, DESCENDING
+
+# Per-user document manifest.
+#
+# One record per ingested upload (filename, type, batch id, chunk count,
+# upload time) in a MongoDB collection indexed on (username, upload_time), so
+# listing a user's documents is an indexed range read instead of a vector
+# search over their chunks.
+
+app_logger = logging.getLogger('app')
+
+doc_col=None
+# One record per user whose pre-manifest uploads were imported from Pinecone
+import_col=None
+
+
+def _connect():
+    # On first use: the collections live in auth's database, on its Mongo client,
+    # and importing this module doesn't need the server
+    global doc_col, import_col
+    if doc_col is None:
+        from .auth import db  # auth imports utils, which imports this module
+        documents=db[os.getenv("DOCUMENTS_COLLECTION","Documents")]
+        imports=db[os.getenv("DOCUMENT_IMPORTS_COLLECTION","DocumentImports")]
+        documents.create_index([("username", ASCENDING), ("upload_time", DESCENDING)])
+        documents.create_index("batch_id", unique=True)
+        imports.create_index("username", unique=True)
+        doc_col, import_col=documents, imports
+
+
+def add_document(username, filename, doc_type, batch_id, chunk_count, upload_time):
+    _connect()
+    doc_col.update_one(
+        {"batch_id": batch_id},
+        {"$set": {
+            "username": username,
+            "filename": filename,
+            "doc_type": doc_type,
+            "batch_id": batch_id,
+            "chunk_count": chunk_count,
+            "upload_time": upload_time,
+        }},
+        upsert=True
+    )
+
+
+def import_documents(username, documents):
+    """Add records for uploads found outside the manifest, leaving existing records untouched."""
+    _connect()
+    for doc in documents:
+        doc_col.update_one(
+            {"batch_id": doc["batch_id"]},
+            {"$setOnInsert": {**doc, "username": username}},
+            upsert=True
+        )
+
+
+def legacy_imported(username):
+    _connect()
+    return import_col.find_one({"username": username}, {"_id": 1}) is not None
+
+
+def mark_legacy_imported(username, count):
+    _connect()
+    import_col.update_one(
+        {"username": username},
+        {"$set": {"username": username, "documents": count,
+                  "imported_at": datetime.datetime.utcnow().isoformat()}},
+        upsert=True
+    )
+
+
+def list_documents(username, page=1, per_page=20):
+    """One page of the user's documents, newest first, and their total count."""
+    _connect()
+    page=max(1, page)
+    cursor=(doc_col.find({"username": username}, {"_id": 0})
+            .sort("upload_time", DESCENDING)
+            .skip((page - 1) * per_page)
+            .limit(per_page))
+    return list(cursor), doc_col.count_documents({"username": username})
+
+
+def count_by_type(username):
+    """{doc_type: count} over all of the user's documents."""
+    _connect()
+    rows=doc_col.aggregate([
+        {"$match": {"username": username}},
+        {"$group": {"_id": "$doc_type", "count": {"$sum": 1}}},
+    ])
+    return {row["_id"]: row["count"] for row in rows}
+
+
+def document_version(username):
+    """Changes whenever the user's document set does: their upload count and newest batch."""
+    _connect()
+    latest=doc_col.find_one({"username": username}, {"_id": 0, "batch_id": 1}, sort=[("upload_time", DESCENDING)])
+    count=doc_col.count_documents({"username": username})
+    return f"{count}:{latest['batch_id'] if latest else ''}"
@@ -0,0 +1,105 @@
+import os
+import re
+import sys
+import json
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Page-parallel PDF text extraction.
+#
+# PDFs with at least PARALLEL_PDF_MIN_PAGES pages are split into page ranges,
+# each extracted and cleaned by a worker process; pages come back in document
+# order as each range finishes, so chunking starts before the whole file is
+# read. Smaller files are extracted in the calling thread, where process
+# start-up would cost more than it saves.
+#
+# A worker is `python -m Backend.pdf_extract <file> <start> <stop>`, which
+# imports nothing but this module and pypdf and prints its pages as JSON.
+# multiprocessing is not used: its spawn and forkserver workers re-run the
+# server's main module (building the app, its LLM, Pinecone and Mongo clients
+# and caches in every worker), and forking the server copies gRPC clients that
+# are not fork-safe. A bounded thread pool launches the workers, so at most
+# PDF_WORKERS run at once across all uploads; a worker that crashes or times
+# out fails only its own document.
+
+PARALLEL_PDF_MIN_PAGES = int(os.getenv("PARALLEL_PDF_MIN_PAGES", "40"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Pages per worker: large enough to amortize starting Python and opening the file
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "32"))
+PDF_TASK_TIMEOUT = float(os.getenv("PDF_TASK_TIMEOUT", "300"))
+
+# Directory containing the Backend package, the workers' working directory
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_launcher = None
+_launcher_lock = threading.Lock()
+
+
+def clean_text(text):
+    text = re.sub(r"\s+", " ", text)
+    text = text.replace(""", '"').replace(""", '"')
+    text = text.replace("'", "'").replace("'", "'")
+    text = text.replace("–", "-").replace("—", "-")
+    return text.strip()
+
+
+def page_count(file_path):
+    from pypdf import PdfReader
+    return len(PdfReader(file_path).pages)
+
+
+def extract_pages(file_path, start, stop):
+    """(cleaned text, metadata) for pages [start, stop), the metadata PyPDFLoader gives each page."""
+    from pypdf import PdfReader
+    reader = PdfReader(file_path)
+    total = len(reader.pages)
+    pages = []
+    for number in range(start, min(stop, total)):
+        page = reader.pages[number]
+        metadata = {"source": file_path, "total_pages": total, "page": number,
+                    "page_label": reader.page_labels[number]}
+        pages.append((clean_text(page.extract_text()), metadata))
+    return pages
+
+
+def extract_pages_in_worker(file_path, start, stop):
+    """extract_pages run in a separate worker process."""
+    result = subprocess.run(
+        [sys.executable, "-m", "Backend.pdf_extract", os.path.abspath(file_path), str(start), str(stop)],
+        cwd=PROJECT_DIR, capture_output=True, timeout=PDF_TASK_TIMEOUT)
+    if result.returncode != 0:
+        error = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise RuntimeError(f"PDF worker for pages {start}-{stop} exited with status {result.returncode}: "
+                           f"{error[-1] if error else 'no output'}")
+    # JSON turns the (text, metadata) tuples into lists; the worker saw an absolute path
+    return [(text, {**metadata, "source": file_path}) for text, metadata in json.loads(result.stdout)]
+
+
+def _get_launcher():
+    global _launcher
+    with _launcher_lock:
+        if _launcher is None:
+            _launcher = ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix="pdf-extract")
+        return _launcher
+
+
+def iter_pdf_pages(file_path, total=None):
+    """Yield (cleaned text, metadata) for every page in order, in parallel for large files."""
+    total = page_count(file_path) if total is None else total
+    if total < PARALLEL_PDF_MIN_PAGES or PDF_WORKERS < 2:
+        yield from extract_pages(file_path, 0, total)
+        return
+
+    starts = range(0, total, PAGES_PER_TASK)
+    # map() returns results in submission order while later ranges are still running
+    results = _get_launcher().map(extract_pages_in_worker, [file_path] * len(starts), starts,
+                                  [start + PAGES_PER_TASK for start in starts])
+    for pages in results:
+        yield from pages
+
+
+if __name__ == "__main__":
+    # Worker entry point: python -m Backend.pdf_extract <file> <start> <stop>
+    path, first, last = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+    json.dump(extract_pages(path, first, last), sys.stdout)
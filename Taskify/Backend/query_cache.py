@@ -0,0 +1,87 @@
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import threading
+import time
+from .stats import Counters
+
+# Persistent cache of pre_retrieval results.
+#
+# The (analysis, optimized query) pair for a request is stored in a local
+# SQLite file under a hash of the normalized request text, so resubmitting the
+# same or a trivially different request (case, spacing, punctuation) skips the
+# query-analysis LLM calls. Entries expire after QUERY_CACHE_TTL seconds and the
+# least recently used ones are evicted past QUERY_CACHE_MAX_ENTRIES.
+
+CACHE_PATH = os.getenv("QUERY_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_cache.db"))
+TTL = float(os.getenv("QUERY_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "5000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS query_analysis (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS query_analysis_last_used ON query_analysis (last_used);
+"""
+
+
+def normalize(text):
+    """Lowercase, punctuation dropped, whitespace collapsed."""
+    return " ".join(re.sub(r"[^\w\s]", " ", str(text).lower()).split())
+
+
+def cache_key(text, namespace=""):
+    return hashlib.sha256(f"{namespace}\0{normalize(text)}".encode("utf-8")).hexdigest()
+
+
+class QueryCache:
+    def __init__(self, path=CACHE_PATH, ttl=TTL, max_entries=MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.counters = Counters("hits", "misses", "expired", "evicted")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value, created FROM query_analysis WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM query_analysis WHERE key = ?", (key,))
+                self.counters.inc("expired")
+                row = None
+            if row is None:
+                self.counters.inc("misses")
+                return None
+            self._conn.execute("UPDATE query_analysis SET last_used = ? WHERE key = ?", (now, key))
+        self.counters.inc("hits")
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO query_analysis VALUES (?, ?, ?, ?)",
+                               (key, json.dumps(value), now, now))
+            excess = self._conn.execute("SELECT COUNT(*) FROM query_analysis").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute("DELETE FROM query_analysis WHERE key IN "
+                                   "(SELECT key FROM query_analysis ORDER BY last_used LIMIT ?)", (excess,))
+                self.counters.inc("evicted", excess)
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM query_analysis").fetchone()[0]
+        counts = self.counters.snapshot()
+        lookups = counts["hits"] + counts["misses"]
+        return {"entries": entries, **counts,
+                "hit_rate": round(counts["hits"] / lookups, 4) if lookups else None}
+
+
+query_cache = QueryCache()
@@ -0,0 +1,53 @@
+import threading
+from collections import deque
+
+# In-process counters and latency summaries for the retrieval pipeline,
+# reported by the /scheduler/api/stats endpoints. Values reset on restart.
+
+
+class LatencyStats:
+    """Latency per name (e.g. per scoring mode) over the last `window` calls."""
+
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def summary(self):
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+        report = {}
+        for name, samples in snapshot.items():
+            pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 1)
+            report[name] = {
+                "count": counts[name],
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 1),
+                "p50_ms": pick(0.5),
+                "p95_ms": pick(0.95),
+                "max_ms": round(samples[-1] * 1000, 1),
+            }
+        return report
+
+
+
+class Counters:
+    """Named counters, e.g. cache hits and misses."""
+
+    def __init__(self, *names):
+        self._values = dict.fromkeys(names, 0)
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
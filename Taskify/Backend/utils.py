@@ -1,7 +1,7 @@
 import warnings
 import os
 import sys
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader
+from langchain_community.document_loaders import Docx2txtLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings,ChatGoogleGenerativeAI
 from langchain.schema import Document
@@ -10,10 +10,18 @@ from langchain.prompts import PromptTemplate
 from langchain_pinecone import PineconeVectorStore
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
+from .embed_cache import embedding_cache, file_hash
+from .pdf_extract import clean_text, iter_pdf_pages
+from . import manifest
+from .stats import LatencyStats
+from .query_cache import query_cache, cache_key as query_cache_key
+from .context_cache import context_cache
+from concurrent.futures import ThreadPoolExecutor, wait
 import re
 import uuid
 import datetime
 import json 
+import time
 
 # Comprehensive warning suppression
 warnings.filterwarnings('ignore')
@@ -33,9 +41,47 @@ load_dotenv()
 
 embedding_model = GoogleGenerativeAIEmbeddings(model="gemini-embedding-001")
 # Use a valid Groq model id; fall back to Gemini at runtime if Groq call fails
-helper_llm = ChatGroq(model=os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"), temperature=0.3)
+HELPER_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+helper_llm = ChatGroq(model=HELPER_MODEL, temperature=0.3)
 main_llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", temperature=0.3)
-vstore = PineconeVectorStore(index_name=os.getenv('INDEX_NAME'),embedding=embedding_model)
+TEXT_KEY = "text"  # metadata field holding the chunk text in Pinecone
+vstore = PineconeVectorStore(index_name=os.getenv('INDEX_NAME'),embedding=embedding_model,text_key=TEXT_KEY)
+
+# Chunks embedded and upserted per request while ingesting
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+
+# Documents per /my-documents page
+DOCUMENTS_PER_PAGE = int(os.getenv("DOCUMENTS_PER_PAGE", "24"))
+# How doc_retrieval asks the LLM for relevance scores: "batched" (one call for
+# all chunks), "concurrent" (one call per chunk, in parallel) or "sequential"
+SCORING_MODE = os.getenv("DOC_SCORING_MODE", "batched")
+SCORING_WORKERS = int(os.getenv("DOC_SCORING_WORKERS", "5"))
+SCORING_TIMEOUT = float(os.getenv("DOC_SCORING_TIMEOUT", "15"))
+DEFAULT_LLM_SCORE = 5  # used when a score can't be obtained
+scoring_pool = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="doc-scoring")
+# Concurrent scoring calls give up after SCORING_TIMEOUT seconds (no retries), so a
+# slow provider can't hold scoring_pool threads that later requests are waiting for
+scoring_helper_llm = ChatGroq(model=HELPER_MODEL, temperature=0.3, timeout=SCORING_TIMEOUT, max_retries=0)
+scoring_main_llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", temperature=0.3, timeout=SCORING_TIMEOUT, max_retries=0)
+scoring_latency = LatencyStats()
+
+# How pre_retrieval gets the query analysis on a cache miss: "two_step" (the
+# analysis, then the search query) or "merged" (one call returning both)
+PRE_RETRIEVAL_MODE = os.getenv("PRE_RETRIEVAL_MODE", "two_step")
+pre_retrieval_latency = LatencyStats()
+
+FALLBACK_ANALYSIS = {
+    'key_terms': ['work', 'schedule', 'plan'],
+    'intent': 'general',
+    'time_preference': 'any',
+    'priority_focus': 'productivity',
+    'duration_hint': 'flexible',
+    'context_type': 'general',
+    'implicit_requirements': [],
+    'success_metrics': ['completion'],
+    'constraints': [],
+    'related_concepts': []
+}
 
 
 
@@ -69,32 +115,39 @@ def validate_password(password):
 
 # Adding doc processing functions 
 
-def clean_text(text):
-    text = re.sub(r"\s+", " ", text)
-    text = text.replace(""", '"').replace(""", '"')
-    text = text.replace("'", "'").replace("'", "'")
-    text = text.replace("–", "-").replace("—", "-")
-    return text.strip()
-
-def process_doc(file_path, doc_type, username=None):
-    pages = []
-    if doc_type == "pdf":
-        loader = PyPDFLoader(file_path=file_path)
-        for page in loader.lazy_load():
-            doc = clean_text(page.page_content)
-            pages.append(Document(page_content=doc,metadata=page.metadata))
-    elif doc_type == "docx":
-        loader = Docx2txtLoader(file_path=file_path)
-        page = loader.load()[0]
-        doc = clean_text(page.page_content)
-        pages.append(Document(page_content=doc,metadata=page.metadata))
+def process_doc(file_path, doc_type, username=None, progress=None):
+    """Parse, chunk, embed and store a document.
+
+    `progress`, if given, is called with counter increments as the work advances
+    (pages_parsed, chunks_total, chunks_embedded, chunks_cached, chunks_stored).
+    """
+    progress = progress or (lambda **counts: None)
+
+    # An identical file this user already ingested has nothing new to store
+    digest = file_hash(file_path)
+    previous = embedding_cache.find_file(username or "unknown", digest)
+    if previous:
+        return True, f"duplicate of {previous[0]}"
+
+    # Chunking
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=500,
+        chunk_overlap=100
+    )
+    chunks = []
     try:
-        # Chunking
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=100
-        )
-        chunks = splitter.split_documents(pages)
+        # Pages are split as they arrive; the splitter works page by page anyway
+        if doc_type == "pdf":
+            for doc, metadata in iter_pdf_pages(file_path):
+                chunks.extend(splitter.split_documents([Document(page_content=doc,metadata=metadata)]))
+                progress(pages_parsed=1)
+        elif doc_type == "docx":
+            loader = Docx2txtLoader(file_path=file_path)
+            page = loader.load()[0]
+            doc = clean_text(page.page_content)
+            chunks.extend(splitter.split_documents([Document(page_content=doc,metadata=page.metadata)]))
+            progress(pages_parsed=1)
+        progress(chunks_total=len(chunks))
 
         # Useful for the metadata of the embeddings
         batch_id = str(uuid.uuid4())
@@ -112,7 +165,11 @@ def process_doc(file_path, doc_type, username=None):
 
 
         # Using pinecone to store the embeddings
-        vstore.add_documents(chunks)
+        store_chunks(chunks, progress)
+        manifest.add_document(username or "unknown", os.path.basename(file_path), doc_type,
+                              batch_id, len(chunks), upload_time)
+        # Recorded last: a file is only a duplicate once it is listed in the manifest
+        embedding_cache.add_file(username or "unknown", digest, os.path.basename(file_path), batch_id)
 
         return True,"succes"
 
@@ -121,62 +178,98 @@ def process_doc(file_path, doc_type, username=None):
         return False,e 
 
 
-def get_user_documents(username):
-    """Retrieve all documents uploaded by a specific user from Pinecone."""
+def store_chunks(chunks, progress=None, batch_size=EMBED_BATCH_SIZE):
+    """Embed and upsert chunks batch by batch, the same records vstore.add_documents writes.
+
+    Vectors come from the embedding cache when the chunk text was embedded before.
+    """
+    progress = progress or (lambda **counts: None)
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        texts = [chunk.page_content for chunk in batch]
+        vectors, cached = embedding_cache.embed_documents(embedding_model, texts)
+        progress(chunks_embedded=len(batch), chunks_cached=cached)
+
+        records = [(str(uuid.uuid4()), vector, {**chunk.metadata, TEXT_KEY: text})
+                   for chunk, vector, text in zip(batch, vectors, texts)]
+        vstore.index.upsert(vectors=records)
+        progress(chunks_stored=len(batch))
+
+
+def get_user_documents(username, page=1, per_page=DOCUMENTS_PER_PAGE):
+    """One page of the documents a user uploaded, newest first, their total count
+    and {doc_type: count} over all of them."""
     try:
-        # Use the existing vector store to query
-        # Create a simple query to retrieve documents with username filter
-        search_results = vstore.similarity_search(
-            query="document",  # Simple query
-            k=1000,  # Get up to 1000 results
-            filter={"username": username}
-        )
-        
-        # Extract unique documents by batch_id
-        docs_dict = {}
-        for doc in search_results:
-            batch_id = doc.metadata.get('upload_batch_id')
-            if batch_id and batch_id not in docs_dict:
-                docs_dict[batch_id] = {
-                    'filename': doc.metadata.get('source_file', 'Unknown'),
-                    'doc_type': doc.metadata.get('doc_type', 'unknown'),
-                    'upload_time': doc.metadata.get('upload_time', 'Unknown'),
-                    'batch_id': batch_id,
-                    'username': doc.metadata.get('username', 'Unknown')
-                }
-        
-        print(f"Found {len(docs_dict)} documents for user {username}")
-        return list(docs_dict.values())
+        if not manifest.legacy_imported(username):
+            import_legacy_documents(username)
+        documents, total = manifest.list_documents(username, page, per_page)
+        return documents, total, manifest.count_by_type(username)
     except Exception as e:
         print(f"Error retrieving documents: {e}")
         import traceback
         traceback.print_exc()
-        return []
+        return [], 0, {}
+
+
+def import_legacy_documents(username):
+    """Add uploads made before the manifest existed, found through their chunks in Pinecone.
 
+    Runs once per user: a marker in Mongo records that the import finished.
+    Uploads already in the manifest are left as they are. The vector search is
+    capped at 1000 chunks, as the old listing was.
+    """
+    search_results = vstore.similarity_search(
+        query="document",  # Simple query
+        k=1000,  # Get up to 1000 results
+        filter={"username": username}
+    )
+    
+    # Extract unique documents by batch_id
+    docs_dict = {}
+    for doc in search_results:
+        batch_id = doc.metadata.get('upload_batch_id')
+        if batch_id and batch_id not in docs_dict:
+            docs_dict[batch_id] = {
+                'filename': doc.metadata.get('source_file', 'Unknown'),
+                'doc_type': doc.metadata.get('doc_type', 'unknown'),
+                'upload_time': doc.metadata.get('upload_time', 'Unknown'),
+                'batch_id': batch_id,
+                'chunk_count': None,
+            }
+    
+    manifest.import_documents(username, docs_dict.values())
+    manifest.mark_legacy_imported(username, len(docs_dict))
+    print(f"Imported {len(docs_dict)} documents for user {username} into the manifest")
 
 
 
 
 # Helper functions for schedule generation 
 
-def llm_text(prompt: str) -> str:
+def llm_text(prompt: str, helper=None, fallback=None) -> str:
     """Invoke helper_llm, falling back to main_llm on error, and return text content."""
+    helper = helper or helper_llm
+    fallback = fallback or main_llm
     try:
-        res = helper_llm.invoke(prompt)
+        res = helper.invoke(prompt)
         # Some LangChain chat models return .content, others raw text
         return str(getattr(res, 'content', res) or "")
     except Exception as e:
         print(f"[llm_text] Groq invoke failed, falling back to Gemini: {e}")
         try:
-            res = main_llm.invoke(prompt)
+            res = fallback.invoke(prompt)
             return str(getattr(res, 'content', res) or "")
         except Exception as e2:
             print(f"[llm_text] Fallback invoke failed: {e2}")
             return ""
 
 
-def pre_retrieval(user_input):
-    query_analysis_prompt = f"""You are an intelligent schedule analysis assistant. Analyze the user's request to understand their EXACT needs and preferences.
+def query_analysis_prompt(user_input, with_search_query=False):
+    # The merged mode asks for the search query in the same JSON object
+    search_query_field = ("""
+11. **search_query**: A concise search query (2-4 sentences) for the user's uploaded documents that combines the MOST relevant key terms and concepts, focuses on the intent and priority above, and uses natural language that matches how information appears in documents"""
+                          if with_search_query else "")
+    return f"""You are an intelligent schedule analysis assistant. Analyze the user's request to understand their EXACT needs and preferences.
 
 User Input: "{user_input}"
 
@@ -191,31 +284,15 @@ Extract and infer the following information with HIGH precision:
 7. **implicit_requirements**: Infer unstated needs (e.g., "study ML" implies need for breaks, deep focus time)
 8. **success_metrics**: How to measure success (tasks completed, skills learned, milestones reached)
 9. **constraints**: Time limits, energy levels, dependencies, deadlines mentioned
-10. **related_concepts**: Broader topics that might appear in their documents (e.g., "Python coding" → programming, algorithms, debugging)
+10. **related_concepts**: Broader topics that might appear in their documents (e.g., "Python coding" → programming, algorithms, debugging){search_query_field}
 
 IMPORTANT: Return ONLY a valid JSON object, no markdown, no explanations.
 
 JSON:"""
 
-    try:
-        analysis_response_text = llm_text(query_analysis_prompt)
-        try:
-            analysis_response = json.loads(analysis_response_text)  # type: ignore
-        except json.JSONDecodeError:
-            analysis_response = {
-                'key_terms': ['work', 'schedule', 'plan'],
-                'intent': 'general',
-                'time_preference': 'any',
-                'priority_focus': 'productivity',
-                'duration_hint': 'flexible',
-                'context_type': 'general',
-                'implicit_requirements': [],
-                'success_metrics': ['completion'],
-                'constraints': [],
-                'related_concepts': []
-            }
 
-        search_query_prompt = f"""You are a document retrieval expert. Create a HIGHLY targeted search query to find the most relevant information from the user's uploaded documents.
+def search_query_prompt(user_input, analysis_response):
+    return f"""You are a document retrieval expert. Create a HIGHLY targeted search query to find the most relevant information from the user's uploaded documents.
 
 **User's Original Request**: "{user_input}"
 
@@ -236,36 +313,78 @@ JSON:"""
 
 **Return ONLY the optimized search query, no labels or explanations:**"""
 
-        optimized_query = llm_text(search_query_prompt) or user_input
+
+def parse_json_object(text):
+    """The JSON object in an LLM response (tolerating code fences or chatter around it), or None."""
+    match = re.search(r'\{.*\}', text or "", re.DOTALL)
+    if not match:
+        return None
+    try:
+        parsed = json.loads(match.group())
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def analyze_two_step(user_input):
+    """(optimized_query, analysis_response, parsed) from the analysis call, then the search query call."""
+    analysis_response = parse_json_object(llm_text(query_analysis_prompt(user_input)))
+    parsed = analysis_response is not None
+    if not parsed:
+        analysis_response = dict(FALLBACK_ANALYSIS)
+    optimized_query = llm_text(search_query_prompt(user_input, analysis_response)) or user_input
+    return optimized_query, analysis_response, parsed
+
+
+def analyze_merged(user_input):
+    """(optimized_query, analysis_response, parsed) from a single call returning both."""
+    analysis_response = parse_json_object(llm_text(query_analysis_prompt(user_input, with_search_query=True)))
+    if analysis_response is None:
+        return user_input, dict(FALLBACK_ANALYSIS), False
+    optimized_query = str(analysis_response.pop('search_query', '') or '').strip() or user_input
+    return optimized_query, analysis_response, True
+
+
+PRE_RETRIEVAL_MODES = {
+    "two_step": analyze_two_step,
+    "merged": analyze_merged,
+}
+
+
+def pre_retrieval(user_input, mode=None):
+    mode = mode or PRE_RETRIEVAL_MODE
+    try:
+        start = time.perf_counter()
+        key = query_cache_key(user_input, namespace=HELPER_MODEL)
+        cached = query_cache.get(key)
+        if cached:
+            pre_retrieval_latency.observe("cache_hit", time.perf_counter() - start)
+            return cached['optimized_query'], cached['analysis_response']
+
+        optimized_query, analysis_response, parsed = PRE_RETRIEVAL_MODES[mode](user_input)
+        # A fallback analysis is not worth keeping; the next request retries the LLM
+        if parsed:
+            query_cache.put(key, {'optimized_query': optimized_query, 'analysis_response': analysis_response})
+        pre_retrieval_latency.observe(mode, time.perf_counter() - start)
         return optimized_query, analysis_response
     except Exception as e:
         print(f"Error in pre-retrieval processing: {e}")
         return "", {}
     
     
-# Retrieving documents
-def doc_retrieval(query,analysis_data):
-    
-    try:
-        retriver=vstore.as_retriever(search_kwargs={"k":5}) 
-        
-        docs=retriver.get_relevant_documents(query=query)
-        
-        
-        # Scoring each document for relevance 
-        # This score will be useful while reranking
-        
-        scored_docs=[]
-        
-        for doc in docs:
-            
-            scoring_prompt = f"""You are a document relevance expert. Rate how useful this document chunk is for creating a personalized schedule.
+def key_terms_text(analysis_data, limit=5):
+    key_terms = analysis_data.get('key_terms', [])
+    return ', '.join(key_terms[:limit]) if isinstance(key_terms, list) else str(key_terms)
+
+
+def scoring_prompt(doc, analysis_data):
+    return f"""You are a document relevance expert. Rate how useful this document chunk is for creating a personalized schedule.
 
 **User's Schedule Needs**:
 - Intent: {analysis_data['intent']}
 - Priority: {analysis_data['priority_focus']}
 - Context Type: {analysis_data['context_type']}
-- Looking For: {', '.join(analysis_data['key_terms'][:5]) if isinstance(analysis_data.get('key_terms', []), list) else str(analysis_data.get('key_terms', ''))}
+- Looking For: {key_terms_text(analysis_data)}
 
 **Document Excerpt**:
 {doc.page_content[:600]}
@@ -278,48 +397,141 @@ def doc_retrieval(query,analysis_data):
 - 1-2: Irrelevant or off-topic
 
 **Return ONLY a single number (1-10):**"""
+
+
+def parse_score(relevance_text):
+    score_match=re.search(r'\d+', relevance_text or "")
+    return int(score_match.group()) if score_match else DEFAULT_LLM_SCORE
+
+
+def score_one(doc, analysis_data, helper=None, fallback=None):
+    try:
+        return parse_score(llm_text(scoring_prompt(doc, analysis_data), helper, fallback))
+    except Exception:
+        return DEFAULT_LLM_SCORE
+
+
+def llm_scores_sequential(docs, analysis_data):
+    """One scoring call per chunk, one after another."""
+    return [score_one(doc, analysis_data) for doc in docs]
+
+
+def llm_scores_batched(docs, analysis_data):
+    """All chunks graded in a single call that returns a JSON array of scores."""
+    excerpts = "\n\n".join(f"[{i+1}]\n{doc.page_content[:600]}" for i, doc in enumerate(docs))
+    prompt = f"""You are a document relevance expert. Rate how useful each document chunk is for creating a personalized schedule.
+
+**User's Schedule Needs**:
+- Intent: {analysis_data['intent']}
+- Priority: {analysis_data['priority_focus']}
+- Context Type: {analysis_data['context_type']}
+- Looking For: {key_terms_text(analysis_data)}
+
+**Document Excerpts**:
+{excerpts}
+
+**Scoring Criteria** (1-10):
+- 9-10: Directly contains tasks, timelines, or specific activities mentioned by user
+- 7-8: Highly relevant context (goals, milestones, priorities that inform scheduling)
+- 5-6: Moderately relevant (general information about topics user mentioned)
+- 3-4: Loosely related (same domain but not directly applicable)
+- 1-2: Irrelevant or off-topic
+
+**Return ONLY a JSON array of {len(docs)} integers, one score per excerpt in order (e.g. [7, 3, 9]):**"""
+
+    response = llm_text(prompt)
+    try:
+        scores = json.loads(re.search(r'\[.*?\]', response, re.DOTALL).group())  # type: ignore
+        if len(scores) == len(docs):
+            return [int(score) for score in scores]
+        print(f"[doc_retrieval] Batched scoring returned {len(scores)} scores for {len(docs)} chunks")
+    except (AttributeError, ValueError, TypeError) as e:
+        print(f"[doc_retrieval] Could not parse batched scores: {e}")
+    return [DEFAULT_LLM_SCORE] * len(docs)
+
+
+def llm_scores_concurrent(docs, analysis_data):
+    """One scoring call per chunk, run in parallel on a bounded pool.
+
+    Each call times out SCORING_TIMEOUT seconds after it starts, per provider
+    tried. The request waits at most twice that, queueing included: calls still
+    queued behind other requests by then are cancelled, and every chunk without
+    an answer scores DEFAULT_LLM_SCORE.
+    """
+    futures = [scoring_pool.submit(score_one, doc, analysis_data, scoring_helper_llm, scoring_main_llm)
+               for doc in docs]
+    wait(futures, timeout=2 * SCORING_TIMEOUT)
+    for future in futures:
+        future.cancel()  # no-op for calls already running or done
+    return [future.result() if future.done() and not future.cancelled() else DEFAULT_LLM_SCORE
+            for future in futures]
+
+
+SCORING_MODES = {
+    "sequential": llm_scores_sequential,
+    "batched": llm_scores_batched,
+    "concurrent": llm_scores_concurrent,
+}
+
+
+# Retrieving documents
+def doc_retrieval(query,analysis_data,mode=None):
+    
+    mode = mode or SCORING_MODE
+    try:
+        retriver=vstore.as_retriever(search_kwargs={"k":5}) 
         
-        try:
-            relevance_text = llm_text(scoring_prompt)
-            score_match=re.search(r'\d+', relevance_text) # type: ignore
-            score=int(score_match.group()) if score_match else 5 
-        
-        except:
-            score=5
-            
-        # Traditional scoring 
+        docs=retriver.get_relevant_documents(query=query)
         
-        content=doc.page_content.lower()
-        traditional_score=0
         
+        # Scoring each document for relevance 
+        # This score will be useful while reranking
         
-        # Score based on key terms 
-        for term in analysis_data['key_terms']:
-            if term in content:
-                traditional_score+=1
+        start=time.perf_counter()
+        try:
+            llm_scores=SCORING_MODES[mode](docs, analysis_data) if docs else []
+        except Exception as e:
+            print(f"[doc_retrieval] {mode} scoring failed: {e}")
+            llm_scores=[DEFAULT_LLM_SCORE]*len(docs)
+        scoring_latency.observe(mode, time.perf_counter()-start)
         
-        # Based on intent relevance
+        scored_docs=[]
         
-        if analysis_data['intent'] in content:
-            traditional_score+=2
+        for doc, score in zip(docs, llm_scores):
             
-        # Based on schedule related stuff
-        
-        if any(word in content for word in ['schedule', 'plan', 'time', 'task', 'routine', 'productivity']):
-                traditional_score += 2
+            # Traditional scoring 
+            
+            content=doc.page_content.lower()
+            traditional_score=0
+            
+            
+            # Score based on key terms 
+            for term in analysis_data['key_terms']:
+                if term in content:
+                    traditional_score+=1
+            
+            # Based on intent relevance
+            
+            if analysis_data['intent'] in content:
+                traditional_score+=2
                 
-        # Getting final score 
-        
-        final_score=(score*0.5)+(traditional_score*0.5)
-        
-        scored_docs.append({
-                'document': doc,
-                'score': final_score,
-                'llm_score': score,
-                'traditional_score': traditional_score,
-                'content': doc.page_content,
-                'metadata': doc.metadata
-            })
+            # Based on schedule related stuff
+            
+            if any(word in content for word in ['schedule', 'plan', 'time', 'task', 'routine', 'productivity']):
+                    traditional_score += 2
+                    
+            # Getting final score 
+            
+            final_score=(score*0.5)+(traditional_score*0.5)
+            
+            scored_docs.append({
+                    'document': doc,
+                    'score': final_score,
+                    'llm_score': score,
+                    'traditional_score': traditional_score,
+                    'content': doc.page_content,
+                    'metadata': doc.metadata
+                })
 
         
         return scored_docs
@@ -600,8 +812,21 @@ Return the corrected JSON immediately, with no markdown formatting:
             
 
             
-def get_context(query):
+def get_context(query, username=None):
     print(f"\n[get_context] Starting with query: {query}")
+    vector = None
+    if username and context_cache.enabled:
+        try:
+            vector = embedding_model.embed_query(query)
+            doc_version = manifest.document_version(username)
+            cached = context_cache.lookup(username, vector, doc_version)
+            if cached:
+                print(f"[get_context] Semantic cache hit for {username}")
+                return cached
+        except Exception as e:
+            print(f"[get_context] Semantic cache lookup failed: {e}")
+            vector = None
+
     optimized_query,analysis_response=pre_retrieval(user_input=query) #type: ignore
     print(f"[get_context] Optimized query: {optimized_query}")
     
@@ -611,5 +836,8 @@ def get_context(query):
     context=reranking(docs,analysis_response) #type: ignore
     print(f"[get_context] Context after reranking (length): {len(context) if context else 0}")
     
+    # An empty context usually means a failed step; don't keep serving it
+    if vector is not None and context:
+        context_cache.store(username, vector, doc_version, (context, analysis_response))
     return context,analysis_response
 